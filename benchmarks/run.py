@@ -0,0 +1,286 @@
+"""Benchmarks for the non-GUI hot paths of Ordbyggaren.
+
+Runs headless. Results can be saved as a JSON baseline; later runs are
+compared against it and the script exits non-zero when a benchmark is
+slower than the baseline by more than the threshold.
+
+    python3 benchmarks/run.py --save                 # record a baseline
+    python3 benchmarks/run.py --threshold 0.25       # compare against it
+    python3 benchmarks/run.py --quick -k results_to  # 500/50k rows, CSV/JSON only
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from ordbyggaren import alignment, dawg, export, phonetics  # noqa: E402
+from ordbyggaren.journal import ResultsJournal  # noqa: E402
+from ordbyggaren.learning_stats import LearningStats  # noqa: E402
+from ordbyggaren.profiles import ProfileManager  # noqa: E402
+from ordbyggaren.lexicon import load_default  # noqa: E402
+from ordbyggaren.results_store import ResultsStore  # noqa: E402
+from ordbyggaren.session import GameSession  # noqa: E402
+from ordbyggaren.words import WORDS  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+SIZES = (500, 50_000, 1_000_000)
+QUICK_SIZES = (500, 50_000)
+
+BENCHMARKS = []
+# Temporary files and other state the benchmarks set up; closed by main().
+_cleanup = contextlib.ExitStack()
+
+
+class Skip(Exception):
+    """Raised by a benchmark whose prerequisites are missing."""
+
+
+def benchmark(name, sized=False):
+    """Register fn(size) -> (callable, calls per run) as a benchmark."""
+    def register(fn):
+        BENCHMARKS.append((name, sized, fn))
+        return fn
+    return register
+
+
+def make_results(n, seed=0):
+    rng = random.Random(seed)
+    words = [(level, w) for level, pairs in WORDS.items() for w, _e in pairs]
+    results = []
+    for i in range(n):
+        level, word = words[rng.randrange(len(words))]
+        results.append({
+            "word": word,
+            "difficulty": level,
+            "correct": rng.random() < 0.8,
+            "attempts": i + 1,
+            "date": f"2026-{1 + i % 12:02d}-{1 + i % 28:02d} 10:{i % 60:02d}",
+        })
+    return results
+
+
+def _tempdir():
+    """A temporary directory removed when the run ends."""
+    return _cleanup.enter_context(tempfile.TemporaryDirectory(prefix='ordbyggaren-bench-'))
+
+
+def _session():
+    return GameSession(load_default(), WORDS, rng=random.Random(1))
+
+
+@benchmark('select_word')
+def bench_select(_size):
+    session = _session()
+    return session.pick_entry, 1000
+
+
+@benchmark('distractors')
+def bench_distractors(_size):
+    session = _session()
+    return lambda: session.scramble('stjärna'), 1000
+
+
+@benchmark('align_word')
+def bench_align(_size):
+    return lambda: alignment.align('stjärna', 'ɧˈæːɳa'), 1000
+
+
+@benchmark('dawg_contains')
+def bench_dawg_contains(_size):
+    graph = dawg.Dawg.from_words(load_default().words())
+    return lambda: 'stjärna' in graph, 10000
+
+
+@benchmark('dawg_anagrams')
+def bench_dawg_anagrams(_size):
+    graph = dawg.Dawg.from_words(load_default().words())
+    return lambda: graph.anagrams('STJÄRNAKO'), 200
+
+
+@benchmark('log_result')
+def bench_log_result(_size):
+    # The app's path: a ProfileJournal on the SQLite profile store.
+    manager = ProfileManager('ordbyggaren', config_dir=_tempdir())
+    _cleanup.callback(manager.store.close)
+    session = GameSession(load_default(), WORDS, journal=manager.journal('bench'))
+    return lambda: session.log_result('stjärna', True), 200
+
+
+@benchmark('log_result_jsonl')
+def bench_log_result_jsonl(_size):
+    journal = ResultsJournal(os.path.join(_tempdir(), 'results.jsonl'))
+    session = GameSession(load_default(), WORDS, journal=journal)
+    return lambda: session.log_result('stjärna', True), 200
+
+
+@benchmark('results_to_csv', sized=True)
+def bench_csv(size):
+    results = make_results(size)
+    return lambda: export.results_to_csv(results, size), 1
+
+
+@benchmark('results_to_json', sized=True)
+def bench_json(size):
+    results = make_results(size)
+    return lambda: export.results_to_json(results, size), 1
+
+
+@benchmark('results_store_build', sized=True)
+def bench_store_build(size):
+    results = make_results(size)
+    return lambda: ResultsStore(results), 1
+
+
+@benchmark('results_to_csv_columnar', sized=True)
+def bench_csv_columnar(size):
+    store = ResultsStore(make_results(size))
+    return lambda: export.results_to_csv(store, size), 1
+
+
+@benchmark('learning_stats', sized=True)
+def bench_learning_stats(size):
+    results = make_results(size)
+    for r in results:
+        r["answer"] = r["word"] if r["correct"] else r["word"][::-1]
+    store = ResultsStore(results)
+    return lambda: LearningStats.from_results(store), 1
+
+
+@benchmark('export_results_pdf', sized=True)
+def bench_pdf(size):
+    try:
+        import cairo  # noqa: F401
+    except ImportError:
+        try:
+            import cairocffi  # noqa: F401
+        except ImportError:
+            raise Skip('cairo not installed')
+    results = make_results(size)
+    path = os.path.join(_tempdir(), 'results.pdf')
+    return lambda: export.export_results_pdf(results, size, path), 1
+
+
+@benchmark('get_phonetics_cached')
+def bench_phonetics_cached(_size):
+    if not shutil.which('espeak-ng'):
+        raise Skip('espeak-ng not installed')
+    _fresh_ipa_memo()
+    phonetics.get_phonetics('stjärna')
+    return lambda: phonetics.get_phonetics('stjärna'), 1000
+
+
+@benchmark('get_phonetics_uncached')
+def bench_phonetics_uncached(_size):
+    if not shutil.which('espeak-ng'):
+        raise Skip('espeak-ng not installed')
+
+    def run():
+        _fresh_ipa_memo()
+        phonetics.get_phonetics('stjärna')
+    return run, 5
+
+
+def _fresh_ipa_memo():
+    """Start from an empty IPA memo in a temporary directory."""
+    phonetics.reset_ipa_memo(os.path.join(_tempdir(), 'ipa.json'))
+
+
+def measure(fn, calls, repeat):
+    """Return the best time per call in seconds over repeat runs."""
+    best = None
+    for _r in range(repeat):
+        start = time.perf_counter()
+        for _c in range(calls):
+            fn()
+        elapsed = (time.perf_counter() - start) / calls
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(sizes, pattern=None, repeat=3):
+    timings = {}
+    for name, sized, factory in BENCHMARKS:
+        for size in (sizes if sized else (None,)):
+            key = f'{name}[{size}]' if size is not None else name
+            if pattern and pattern not in key:
+                continue
+            try:
+                fn, calls = factory(size)
+            except Skip as e:
+                print(f'{key:40} skipped ({e})')
+                continue
+            # Large single-shot runs are measured once.
+            reps = 1 if size and size >= 1_000_000 else repeat
+            timings[key] = measure(fn, calls, reps)
+            print(f'{key:40} {_fmt(timings[key])}')
+    return timings
+
+
+def compare(timings, baseline, threshold):
+    """Return the benchmarks slower than baseline * (1 + threshold)."""
+    regressions = []
+    for key, seconds in timings.items():
+        base = baseline.get(key)
+        if base and seconds > base * (1 + threshold):
+            regressions.append((key, base, seconds))
+    return regressions
+
+
+def _fmt(seconds):
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:10.1f} µs'
+    if seconds < 1:
+        return f'{seconds * 1e3:10.1f} ms'
+    return f'{seconds:10.2f} s'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file')
+    parser.add_argument('--save', action='store_true', help='write results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown as a fraction (default 0.25)')
+    parser.add_argument('--quick', action='store_true', help='skip the 1M-row exports')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-k', dest='pattern', help='only run benchmarks containing this text')
+    args = parser.parse_args(argv)
+
+    with _cleanup:
+        # Back to the user's IPA memo after the phonetics benchmarks.
+        _cleanup.callback(phonetics.reset_ipa_memo)
+        timings = run(QUICK_SIZES if args.quick else SIZES, args.pattern, args.repeat)
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f).get('timings', {})
+        baseline.update(timings)
+        with open(args.baseline, 'w') as f:
+            json.dump({'python': platform.python_version(),
+                       'machine': platform.machine(),
+                       'timings': baseline}, f, indent=2, sort_keys=True)
+        print(f'Baseline written to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('No baseline; run with --save to create one.')
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f).get('timings', {})
+    regressions = compare(timings, baseline, args.threshold)
+    for key, base, seconds in regressions:
+        print(f'REGRESSION {key}: {_fmt(base).strip()} -> {_fmt(seconds).strip()}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""Grapheme-phoneme alignment of lexicon words, for sound-chunk tiles.
+
+Swedish spells many single sounds with several letters: sj, skj, stj and
+sch for [ɧ], tj and kj for [ɕ], ng for [ŋ], ck and double consonants for
+one consonant. Whether two letters form one sound often depends on the
+word ("skina" [ɧ] but "skola" [sk], "ingen" [ŋ] but "ingå" [nɡ]), so the
+spelling is aligned with the word's IPA: a small dynamic program over
+the letters and IPA segments picks the split into known graphemes that
+explains the transcription with the fewest chunks.
+
+Alignments are computed once per lexicon (one batched espeak-ng run for
+words without IPA) and kept in an index on disk, so splitting a word into
+tiles at play time is a dictionary lookup. Words missing from the index
+fall back to a split on graphemes that are always one sound.
+
+    python3 -m ordbyggaren.alignment stjärna ring flicka
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import unicodedata
+from collections import namedtuple
+
+from ordbyggaren import phonetics
+
+# Bump when the grapheme table or the alignment changes.
+ALIGNMENT_VERSION = 1
+
+Chunk = namedtuple('Chunk', 'grapheme phoneme')
+
+# IPA segments each grapheme may stand for, as espeak-ng transcribes
+# Swedish; length and stress marks are stripped first. An empty string
+# means the letters are silent (r before a retroflex consonant).
+GRAPHEMES = {
+    'a': ('a', 'ɑ', 'ɐ'), 'b': ('b',), 'c': ('s', 'k'), 'd': ('d', 'ɖ'),
+    'e': ('e', 'ɛ', 'ə', 'æ', 'ɪ'), 'f': ('f',), 'g': ('ɡ', 'g', 'j'),
+    'h': ('h',), 'i': ('i', 'ɪ', 'j'), 'j': ('j',), 'k': ('k', 'ɕ'),
+    'l': ('l', 'ɭ'), 'm': ('m',), 'n': ('n', 'ɳ', 'ŋ'), 'o': ('u', 'ʊ', 'ɔ', 'o'),
+    'p': ('p',), 'q': ('k',), 'r': ('r', 'ɾ', 'ɹ', ''), 's': ('s', 'ʂ'),
+    't': ('t', 'ʈ'), 'u': ('ʉ', 'ɵ', 'u', 'ʊ'), 'v': ('v',), 'w': ('v', 'w'),
+    'x': ('ks',), 'y': ('y', 'ʏ'), 'z': ('s',), 'å': ('o', 'ɔ'),
+    'ä': ('ɛ', 'æ', 'e'), 'ö': ('ø', 'œ', 'ɵ'),
+    # One sound, several letters.
+    'sj': ('ɧ', 'ʃ', 'x'), 'skj': ('ɧ', 'ʃ', 'x'), 'stj': ('ɧ', 'ʃ', 'x'),
+    'sch': ('ɧ', 'ʃ', 'x'), 'sk': ('ɧ', 'ʃ', 'x'), 'ch': ('ɧ', 'ɕ', 'ʃ'),
+    'tj': ('ɕ', 'ç'), 'kj': ('ɕ', 'ç'), 'gj': ('j',), 'dj': ('j',),
+    'lj': ('j',), 'hj': ('j',), 'ng': ('ŋ',), 'ck': ('k',),
+    'bb': ('b',), 'dd': ('d', 'ɖ'), 'ff': ('f',), 'gg': ('ɡ', 'g'),
+    'kk': ('k',), 'll': ('l', 'ɭ'), 'mm': ('m',), 'nn': ('n', 'ɳ'),
+    'pp': ('p',), 'rr': ('r', 'ɾ'), 'ss': ('s', 'ʂ'), 'tt': ('t', 'ʈ'),
+}
+LONGEST = max(len(g) for g in GRAPHEMES)
+
+# Multi-letter graphemes that are one sound wherever they occur; used
+# when a word has no alignment in the index.
+STABLE = ('skj', 'stj', 'sch', 'sj', 'tj', 'ck', 'bb', 'dd', 'ff', 'gg', 'kk',
+          'll', 'mm', 'nn', 'pp', 'rr', 'ss', 'tt')
+
+_STRIP = "ˈˌː.'/-_ "
+# Cost of a letter that matches none of its sounds; high enough that any
+# consistent split wins, but alignment never fails outright.
+_MISMATCH = 4
+
+
+def segments(ipa):
+    """Split an IPA string into sound segments, diacritics attached."""
+    out = []
+    for ch in ipa:
+        if ch in _STRIP:
+            continue
+        if out and (unicodedata.combining(ch) or out[-1].endswith('͡')):
+            out[-1] += ch
+        else:
+            out.append(ch)
+    return out
+
+
+def _base(segment):
+    return ''.join(ch for ch in segment if not unicodedata.combining(ch))
+
+
+def align(word, ipa):
+    """Return the word as a list of Chunks matched to IPA segments.
+
+    Chunks cover the word's letters in order. Returns None when there is
+    no transcription.
+    """
+    segs = [_base(s) for s in segments(ipa or '')]
+    if not segs:
+        return None
+    letters = word.lower()
+    n, m = len(letters), len(segs)
+    inf = float('inf')
+    # best[i][j]: (cost, back pointer) for letters[:i] against segs[:j].
+    best = [[(inf, None)] * (m + 1) for _i in range(n + 1)]
+    best[0][0] = (0, None)
+    for i in range(n):
+        for j in range(m + 1):
+            cost = best[i][j][0]
+            if cost == inf:
+                continue
+            for k in range(1, min(LONGEST, n - i) + 1):
+                grapheme = letters[i:i + k]
+                for sound in GRAPHEMES.get(grapheme, ()):
+                    width = _match(segs, j, sound)
+                    if width is not None and cost + 1 < best[i + k][j + width][0]:
+                        best[i + k][j + width] = (cost + 1, (i, j))
+            # A letter the table does not explain takes one segment, or none.
+            for width in (1, 0):
+                if j + width <= m and cost + _MISMATCH < best[i + 1][j + width][0]:
+                    best[i + 1][j + width] = (cost + _MISMATCH, (i, j))
+    # Leftover segments (e.g. an inserted vowel) go with the last chunk.
+    end = min(range(m + 1), key=lambda j: best[n][j][0] + _MISMATCH * (m - j))
+    chunks = []
+    i, j = n, end
+    while best[i][j][1] is not None:
+        pi, pj = best[i][j][1]
+        chunks.append(Chunk(word[pi:i], ''.join(segs[pj:j])))
+        i, j = pi, pj
+    chunks.reverse()
+    if chunks and end < m:
+        last = chunks[-1]
+        chunks[-1] = last._replace(phoneme=last.phoneme + ''.join(segs[end:]))
+    return chunks
+
+
+def _match(segs, j, sound):
+    """Number of segments from j that spell sound, or None."""
+    if not sound:
+        return 0
+    width = 0
+    rest = sound
+    while rest:
+        if j + width >= len(segs) or not rest.startswith(segs[j + width]):
+            return None
+        rest = rest[len(segs[j + width]):]
+        width += 1
+    return width
+
+
+def spell(word):
+    """Split a word on STABLE graphemes only, without a transcription."""
+    letters = word.lower()
+    chunks = []
+    i = 0
+    while i < len(letters):
+        for k in range(LONGEST, 1, -1):
+            if letters[i:i + k] in STABLE:
+                break
+        else:
+            k = 1
+        chunks.append(word[i:i + k])
+        i += k
+    return chunks
+
+
+def default_index_path():
+    xdg = os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))
+    return os.path.join(xdg, 'ordbyggaren', 'alignments.json')
+
+
+class AlignmentIndex:
+    """Precomputed word -> grapheme chunks, persisted next to the IPA memo.
+
+    The index is tied to the espeak-ng version (the transcriptions it was
+    aligned with) and ALIGNMENT_VERSION, and is rebuilt when either changes.
+    Nothing is read on construction: load() probes espeak-ng and reads the
+    file, and until then every word falls back to spell().
+    """
+
+    def __init__(self, path=None, lang='sv'):
+        self.path = path or default_index_path()
+        self.lang = lang
+        self._version = None
+        self._words = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def load(self):
+        """Read the index from disk, once. Runs espeak-ng; keep off the main loop."""
+        with self._lock:
+            if self._version is None:
+                self._version = f'{ALIGNMENT_VERSION}:{phonetics.espeak_version()}'
+                self._read()
+
+    def load_async(self):
+        thread = threading.Thread(target=self.load, name='alignment-index', daemon=True)
+        thread.start()
+        return thread
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get('version') == self._version:
+            table = data.get('words', {}).get(self.lang, {})
+            self._words = {w: tuple(Chunk(*c) for c in chunks) for w, chunks in table.items()}
+
+    def _write(self):
+        data = {'version': self._version,
+                'words': {self.lang: {w: [list(c) for c in chunks]
+                                      for w, chunks in self._words.items()}}}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def build(self, entries):
+        """Align every lexicon entry not in the index yet.
+
+        Entries carry their IPA when the lexicon was compiled with it; the
+        rest are transcribed in one batch. Returns the number added.
+        """
+        try:
+            self.load()
+            with self._lock:
+                known = self._words
+            todo = {e.word: e.ipa for e in entries if e.word and e.word not in known}
+            missing = [w for w, ipa in todo.items() if not ipa]
+            if missing:
+                todo.update(phonetics.get_phonetics_batch(missing, self.lang))
+            added = {}
+            for word, ipa in todo.items():
+                chunks = align(word, ipa)
+                if chunks:
+                    added[word] = tuple(chunks)
+            if added:
+                with self._lock:
+                    self._words = {**self._words, **added}
+                    if self._version.split(':', 1)[1]:
+                        try:
+                            self._write()
+                        except OSError:
+                            pass
+            return len(added)
+        finally:
+            # Words not aligned fall back to spell(); never leave waiting.
+            self._ready.set()
+
+    def build_async(self, entries):
+        entries = list(entries)
+        thread = threading.Thread(target=self.build, args=(entries,),
+                                  name='alignment-index', daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def __len__(self):
+        return len(self._words)
+
+    def __contains__(self, word):
+        return word in self._words
+
+    def chunks(self, word):
+        """The word's Chunks, or None when it has not been aligned."""
+        return self._words.get(word)
+
+    def graphemes(self, word):
+        """The word split into sound-chunk tiles, in upper case."""
+        chunks = self._words.get(word)
+        parts = [c.grapheme for c in chunks] if chunks else spell(word)
+        return [p.upper() for p in parts]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(lang='sv'):
+    """Return the shared alignment index; call build_async() or load_async() on it once."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = AlignmentIndex(lang=lang)
+        return _index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m ordbyggaren.alignment',
+        description='Show how words split into sound chunks, or build the index.')
+    parser.add_argument('words', nargs='*', help='words to align (default: the whole lexicon)')
+    parser.add_argument('--lexicon', help='compiled lexicon file (default: installed or built-in)')
+    parser.add_argument('--lang', default='sv')
+    args = parser.parse_args(argv)
+
+    from ordbyggaren import lexicon as lexicon_mod
+    lex = lexicon_mod.Lexicon(args.lexicon) if args.lexicon else lexicon_mod.load_default()
+    index = AlignmentIndex(lang=args.lang)
+    if args.words:
+        entries = [lex.find(w) or lexicon_mod.LexiconEntry(w, '', '', 0, (), '')
+                   for w in args.words]
+    else:
+        entries = list(lex)
+    added = index.build(entries)
+    if not args.words:
+        print(f'{len(index)} words aligned ({added} new)')
+        return 0
+    for entry in entries:
+        chunks = index.chunks(entry.word)
+        if chunks:
+            print(entry.word + ': ' + ' '.join(f'{c.grapheme}/{c.phoneme}' for c in chunks))
+        else:
+            print(entry.word + ': ' + ' '.join(spell(entry.word)) + ' (no IPA)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""Class reports: export several profiles at once.
+
+Profiles are read from the profile store the app logs results to. A ZIP
+gets one CSV or JSON file per profile, each read and serialized in a
+process pool; a PDF gets one section per profile, drawn in order into one
+document. A profile that cannot be read is reported and skipped without
+stopping the others.
+
+    python3 -m ordbyggaren.class_report -o klass.zip
+    python3 -m ordbyggaren.class_report --format pdf -o klass.pdf anna olle
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import gettext
+_ = gettext.gettext
+
+from ordbyggaren import export
+from ordbyggaren.profiles import ProfileManager, read_profile
+
+try:
+    import gi
+    gi.require_version('Gtk', '4.0')
+    gi.require_version('Adw', '1')
+    from gi.repository import Gtk, Adw, GLib
+except Exception:
+    pass
+
+APP_NAME = 'ordbyggaren'
+FORMATS = ('zip', 'pdf')
+MEMBER_FORMATS = {'csv': export.iter_csv, 'json': export.iter_json}
+
+ClassReport = namedtuple('ClassReport', 'path exported failed')
+
+
+def _load_profile(source):
+    """Return (results, score) for a stored profile; missing means empty.
+
+    Unlike ProfileManager.load_profile, unreadable data raises. The score
+    is the number of correct answers unless the profile stores one.
+    """
+    data = read_profile(source)
+    if not isinstance(data, dict):
+        raise ValueError(_("not a profile file"))
+    results = data.get('results', [])
+    if not isinstance(results, list):
+        raise ValueError(_("results is not a list"))
+    results = [r for r in results if isinstance(r, dict)]
+    score = data.get('score')
+    if score is None:
+        score = sum(1 for r in results if r.get('correct'))
+    return results, int(score)
+
+
+def _serialize_profile(source, member_format):
+    """Read a profile and return its ZIP member as bytes; runs in a worker."""
+    results, score = _load_profile(source)
+    return ''.join(MEMBER_FORMATS[member_format](results, score)).encode('utf-8')
+
+
+def export_class_report(manager, output_path, fmt='zip', names=None,
+                        member_format='csv', max_workers=None, progress=None):
+    """Export the named profiles (default: all) into one ZIP or PDF.
+
+    Returns a ClassReport with the exported names and (name, error) pairs
+    for the profiles that failed. Raises RuntimeError for a PDF when cairo
+    is missing.
+
+    Args:
+        max_workers: Processes serializing ZIP members (default: one per
+            CPU, at most one per profile).
+        progress: Optional callable(done, total, name) called per profile.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'unknown format {fmt!r}')
+    names = sorted(names if names is not None else manager.list_profiles())
+    exported, failed = [], []
+    if fmt == 'zip':
+        workers = max_workers or min(len(names), os.cpu_count() or 1) or 1
+        # spawn, not fork: the caller may be a threaded GTK process. Each
+        # worker reads through its own read-only database connection.
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool, \
+                zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            futures = [(name, pool.submit(_serialize_profile, manager.profile_source(name),
+                                          member_format))
+                       for name in names]
+            # Members are written in name order while later profiles are
+            # still being serialized.
+            for i, (name, future) in enumerate(futures, 1):
+                try:
+                    zf.writestr(f'{name}.{member_format}', future.result())
+                    exported.append(name)
+                except Exception as e:
+                    failed.append((name, str(e) or type(e).__name__))
+                if progress:
+                    progress(i, len(names), name)
+            if failed:
+                zf.writestr('errors.txt', ''.join(f'{n}: {msg}\n' for n, msg in failed))
+        return ClassReport(output_path, exported, failed)
+
+    # Sections are drawn into one cairo document, so the PDF stays serial.
+    cairo = export._import_cairo()
+    if cairo is None:
+        raise RuntimeError(_("PDF export requires cairo."))
+    report = export.PdfReport(cairo, output_path)
+    for i, name in enumerate(names, 1):
+        try:
+            results, score = _load_profile(manager.profile_source(name))
+            report.add_section(name, results, score)
+            exported.append(name)
+        except Exception as e:
+            failed.append((name, str(e) or type(e).__name__))
+        if progress:
+            progress(i, len(names), name)
+    report.finish()
+    return ClassReport(output_path, exported, failed)
+
+
+def summary(report):
+    """One-line status text for a finished class report."""
+    msg = _("Exported %d profiles") % len(report.exported)
+    if report.failed:
+        msg += " — " + _("failed: %s") % ", ".join(name for name, _e in report.failed)
+    return msg
+
+
+def show_class_report_dialog(window, status_callback=None):
+    """Let the user pick profiles and a format, then export in the background."""
+    manager = ProfileManager(APP_NAME)
+    dialog = Adw.AlertDialog.new(_("Class Report"),
+                                 _("Choose the profiles to include:"))
+    box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=4)
+    checks = []
+    for name in sorted(manager.list_profiles()):
+        check = Gtk.CheckButton(label=name, active=True)
+        box.append(check)
+        checks.append((name, check))
+    dialog.set_extra_child(box)
+
+    dialog.add_response("cancel", _("Cancel"))
+    dialog.add_response("zip", _("ZIP"))
+    dialog.add_response("pdf", _("PDF"))
+    dialog.set_default_response("zip")
+    dialog.set_close_response("cancel")
+    dialog.connect("response", _on_response, window, manager, checks, status_callback)
+    dialog.present(window)
+
+
+def _on_response(dialog, response, window, manager, checks, status_callback):
+    if response == "cancel":
+        return
+    names = [name for name, check in checks if check.get_active()]
+    if not names:
+        return
+    file_dialog = Gtk.FileDialog.new()
+    file_dialog.set_title(_("Save Class Report"))
+    file_dialog.set_initial_name(
+        f"ordbyggaren_klass_{datetime.now().strftime('%Y-%m-%d')}.{response}")
+    file_dialog.save(window, None, _on_file_done, manager, names, response, status_callback)
+
+
+def _on_file_done(dialog, result, manager, names, fmt, status_callback):
+    try:
+        gfile = dialog.save_finish(result)
+    except GLib.Error:
+        return
+
+    def report(msg):
+        if status_callback:
+            GLib.idle_add(export._call_once, status_callback, msg)
+
+    def progress(done, total, name):
+        report(_("Class report… %d/%d") % (done, total))
+
+    def run():
+        try:
+            report(summary(export_class_report(manager, gfile.get_path(), fmt, names,
+                                               progress=progress)))
+        except Exception as e:
+            report(_("Export error: %s") % str(e))
+
+    threading.Thread(target=run, name='class-report', daemon=True).start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m ordbyggaren.class_report',
+        description='Export several profiles into one ZIP or PDF.')
+    parser.add_argument('profiles', nargs='*', help='profile names (default: all)')
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--format', choices=FORMATS, default='zip')
+    parser.add_argument('--member-format', choices=sorted(MEMBER_FORMATS), default='csv',
+                        help='file format inside the ZIP')
+    parser.add_argument('--workers', type=int, help='processes for ZIP members')
+    parser.add_argument('--backend', choices=('json', 'sqlite'), default='sqlite',
+                        help='profile store to read from')
+    args = parser.parse_args(argv)
+
+    report = export_class_report(ProfileManager(APP_NAME, backend=args.backend), args.output,
+                                 args.format, args.profiles or None, args.member_format,
+                                 args.workers)
+    for name, error in report.failed:
+        print(f'{name}: {error}', file=sys.stderr)
+    print(summary(report))
+    return 1 if report.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
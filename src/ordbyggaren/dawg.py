@@ -0,0 +1,224 @@
+"""A compact word graph (DAWG) over the lexicon for checking built words.
+
+The lexicon's words are compiled into a minimal deterministic acyclic
+word graph: common prefixes and suffixes share nodes, so even a large
+lexicon fits in a few flat arrays. Checking whether a built word is a
+real word walks one edge per letter, and every word that can be built
+from a multiset of tiles is found by one search that never leaves the
+graph. The graph is built on first use and shared by every window:
+
+    python3 -m ordbyggaren.dawg KOB SOL
+"""
+import argparse
+import sys
+import threading
+from array import array
+from collections import Counter
+
+
+class Dawg:
+    """A minimal DAWG of lower-case words.
+
+    Node n's outgoing edges are labels[first[n]:first[n + 1]] with the
+    matching targets; node 0 is the root.
+    """
+
+    def __init__(self, labels, first, targets, final, count):
+        self._labels = labels
+        self._first = first
+        self._targets = targets
+        self._final = final
+        self._count = count
+
+    @classmethod
+    def from_words(cls, words):
+        """Build the graph from any iterable of words."""
+        builder = _Builder()
+        for word in sorted({w.lower() for w in words if w}):
+            builder.insert(word)
+        return builder.finish()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nodes(self):
+        return len(self._final)
+
+    def _step(self, node, text):
+        """Follow text from node; the node reached, or -1."""
+        labels, first, targets = self._labels, self._first, self._targets
+        for ch in text:
+            k = labels.find(ch, first[node], first[node + 1])
+            if k < 0:
+                return -1
+            node = targets[k]
+        return node
+
+    def __contains__(self, word):
+        node = self._step(0, word.lower())
+        return node >= 0 and self._final[node] == 1
+
+    def has_prefix(self, prefix):
+        return self._step(0, prefix.lower()) >= 0
+
+    def anagrams(self, tiles, length=None):
+        """Every word that can be built from the tiles, sorted.
+
+        Args:
+            tiles: Tile labels (letters or sound chunks such as 'STJ'); each
+                can be used as often as it occurs.
+            length: Only words of exactly this many tiles; by default words
+                of any length.
+        """
+        remaining = Counter(t.lower() for t in tiles)
+        found = set()
+        path = []
+
+        def search(node):
+            if self._final[node] and (length is None or len(path) == length):
+                found.add(''.join(path))
+            if length is not None and len(path) == length:
+                return
+            for tile in list(remaining):
+                if not remaining[tile]:
+                    continue
+                nxt = self._step(node, tile)
+                if nxt < 0:
+                    continue
+                remaining[tile] -= 1
+                path.append(tile)
+                search(nxt)
+                path.pop()
+                remaining[tile] += 1
+
+        search(0)
+        return sorted(found)
+
+
+class _Builder:
+    """Incremental construction from sorted words (Daciuk et al. 2000).
+
+    After each word, the part of the previous word that is no longer
+    shared is minimized: each of its nodes is replaced by an equivalent
+    node already in the register, if there is one.
+    """
+
+    def __init__(self):
+        self._edges = [{}]
+        self._final = [False]
+        self._register = {}
+        self._unchecked = []     # (parent, letter, child) along the last word
+        self._previous = ''
+        self._count = 0
+
+    def insert(self, word):
+        common = 0
+        for a, b in zip(word, self._previous):
+            if a != b:
+                break
+            common += 1
+        self._minimize(common)
+        node = self._unchecked[-1][2] if self._unchecked else 0
+        for letter in word[common:]:
+            child = len(self._edges)
+            self._edges.append({})
+            self._final.append(False)
+            self._edges[node][letter] = child
+            self._unchecked.append((node, letter, child))
+            node = child
+        self._final[node] = True
+        self._previous = word
+        self._count += 1
+
+    def _minimize(self, down_to):
+        while len(self._unchecked) > down_to:
+            parent, letter, child = self._unchecked.pop()
+            key = (self._final[child], tuple(sorted(self._edges[child].items())))
+            existing = self._register.get(key)
+            if existing is not None:
+                self._edges[parent][letter] = existing
+                self._edges[child] = None
+            else:
+                self._register[key] = child
+
+    def finish(self):
+        """Minimize the rest and pack the reachable nodes into arrays."""
+        self._minimize(0)
+        order = {}
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if node in order:
+                continue
+            order[node] = len(order)
+            stack.extend(self._edges[node].values())
+        labels = []
+        first = array('I')
+        targets = array('I')
+        final = bytearray(len(order))
+        for node, index in sorted(order.items(), key=lambda item: item[1]):
+            first.append(len(labels))
+            for letter, child in sorted(self._edges[node].items()):
+                labels.append(letter)
+                targets.append(order[child])
+            final[index] = self._final[node]
+        first.append(len(labels))
+        return Dawg(''.join(labels), first, targets, final, self._count)
+
+
+_dawgs = {}
+_dawgs_lock = threading.Lock()
+
+
+def _key(lexicon):
+    path = getattr(lexicon, 'path', None)
+    return ('path', path) if path else ('words', frozenset(lexicon.words()))
+
+
+def get_dawg(lexicon):
+    """Return the shared graph for a lexicon, building it on first use.
+
+    Windows that open the same lexicon file (or the same built-in list)
+    share one graph.
+    """
+    key = _key(lexicon)
+    with _dawgs_lock:
+        dawg = _dawgs.get(key)
+        if dawg is None:
+            dawg = _dawgs[key] = Dawg.from_words(lexicon.words())
+        return dawg
+
+
+def get_dawg_async(lexicon, callback):
+    """Build or fetch the graph on a worker thread, then call callback(dawg)."""
+    thread = threading.Thread(target=lambda: callback(get_dawg(lexicon)),
+                              name='dawg', daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m ordbyggaren.dawg',
+        description='Check words against the lexicon, or list the words some tiles build.')
+    parser.add_argument('words', nargs='*', help='words to check or tile strings')
+    parser.add_argument('--tiles', action='store_true',
+                        help='list every word buildable from the letters of each argument')
+    parser.add_argument('--lexicon', help='compiled lexicon file (default: installed or built-in)')
+    args = parser.parse_args(argv)
+
+    from ordbyggaren import lexicon as lexicon_mod
+    lex = lexicon_mod.Lexicon(args.lexicon) if args.lexicon else lexicon_mod.load_default()
+    dawg = get_dawg(lex)
+    print(f'{len(dawg)} words, {dawg.nodes} nodes')
+    for word in args.words:
+        if args.tiles:
+            print(f'{word}: ' + ' '.join(dawg.anagrams(word)))
+        else:
+            print(f'{word}: ' + ('yes' if word in dawg else 'no'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Distractor letters chosen by how easily they are confused.
+
+A fixed confusion matrix over the Swedish tile letters combines visual
+similarity of the capital letters (E/F, M/N, P/R) and phonological
+similarity (voiced/voiceless pairs such as B/P, and vowels such as E/Ä
+and O/Å). Each learner's own mix-ups from LearningStats are added on
+top, so letters a child actually confuses show up more often.
+
+A candidate is scored by its closest letter in the word, on top of a base
+weight every letter has, so similar letters are preferred without crowding
+out the rest. Letters that only differ from a letter in the word by dots
+or a ring (Ö next to "sol") are too close to be fair and are never used.
+Scoring every candidate for a word is one pass over the matrix rows of the
+word's letters (NumPy when installed).
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DISTRACTOR_LETTERS = "ABCDEFGHIJKLMNOPRSTUVÅÄÖ"
+
+# (letter, letter, similarity 0..1), symmetric.
+VISUAL = (
+    ("O", "C", 0.5), ("C", "G", 0.7), ("O", "G", 0.4), ("O", "D", 0.4),
+    ("E", "F", 0.9), ("P", "R", 0.8), ("P", "B", 0.6), ("B", "R", 0.6),
+    ("M", "N", 0.9), ("N", "H", 0.5), ("U", "V", 0.8), ("I", "L", 0.6),
+    ("I", "J", 0.7), ("I", "T", 0.5), ("T", "L", 0.3), ("E", "L", 0.3),
+    ("U", "O", 0.3), ("K", "R", 0.3),
+)
+PHONOLOGICAL = (
+    ("B", "P", 1.0), ("D", "T", 1.0), ("G", "K", 1.0), ("V", "F", 1.0),
+    ("M", "N", 0.8), ("E", "Ä", 1.0), ("O", "Å", 1.0), ("U", "O", 0.7),
+    ("E", "I", 0.6), ("Ä", "Ö", 0.4), ("G", "J", 0.7), ("K", "T", 0.3),
+    ("S", "K", 0.3), ("L", "R", 0.5), ("Ö", "U", 0.5),
+)
+# Letters that only differ by dots or a ring; one is never a distractor
+# for a word containing the other.
+VARIANTS = (("O", "Ö"), ("A", "Ä"), ("A", "Å"), ("Å", "Ä"))
+# Weight of the closest similarity, relative to the base weight of 1 that
+# every letter has. 1.0 makes the most similar letters twice as likely.
+SIMILAR_WEIGHT = 1.0
+# Weight of the learner's most frequent confusion, on the same scale.
+LEARNER_WEIGHT = 1.0
+
+
+def confusion_matrix(letters=DISTRACTOR_LETTERS):
+    """Return the fixed similarity matrix (0..1) as a list of rows."""
+    index = {c: i for i, c in enumerate(letters)}
+    matrix = [[0.0] * len(letters) for _c in letters]
+    for a, b, similarity in VISUAL + PHONOLOGICAL:
+        if a in index and b in index:
+            i, j = index[a], index[b]
+            matrix[i][j] = matrix[j][i] = max(matrix[i][j], similarity)
+    return matrix
+
+
+def excluded(letters=DISTRACTOR_LETTERS):
+    """{letter: letters never used as its distractor}, including itself."""
+    out = {c: {c} for c in letters}
+    for a, b in VARIANTS:
+        if a in out and b in out:
+            out[a].add(b)
+            out[b].add(a)
+    return out
+
+
+class DistractorEngine:
+    """Picks distractor letters for a word.
+
+    Args:
+        stats: Optional LearningStats whose confused pairs (expected,
+            placed) raise the score of the placed letter for words that
+            contain the expected one.
+    """
+
+    def __init__(self, letters=DISTRACTOR_LETTERS, stats=None,
+                 similar_weight=SIMILAR_WEIGHT, learner_weight=LEARNER_WEIGHT):
+        self.letters = letters
+        self._index = {c: i for i, c in enumerate(letters)}
+        self._fixed = confusion_matrix(letters)
+        self._excluded = excluded(letters)
+        self.stats = stats
+        self.similar_weight = similar_weight
+        self.learner_weight = learner_weight
+        self._matrix = None
+        self._version = None
+
+    def _combined(self):
+        """Weighted fixed matrix plus the learner's confusions, rebuilt when
+        they change."""
+        version = (id(self.stats), self.stats.pairs_version) if self.stats is not None else None
+        if self._matrix is not None and version == self._version:
+            return self._matrix
+        matrix = [[self.similar_weight * m for m in row] for row in self._fixed]
+        pairs = self.stats.pairs if self.stats is not None else {}
+        most = max(pairs.values(), default=0)
+        for (expected, placed), n in pairs.items():
+            i, j = self._index.get(expected), self._index.get(placed)
+            if i is not None and j is not None:
+                matrix[i][j] += self.learner_weight * n / most
+        self._matrix = np.array(matrix) if np is not None else matrix
+        self._version = version
+        return self._matrix
+
+    def scores(self, word):
+        """Weight of every candidate letter for word; 0 for letters that
+        are in it or too close to a letter in it."""
+        matrix = self._combined()
+        rows = sorted({self._index[c] for c in word.upper() if c in self._index})
+        if not rows:
+            scores = [1.0] * len(self.letters)
+        elif np is not None:
+            scores = (1.0 + matrix[rows].max(axis=0)).tolist()
+        else:
+            scores = [1.0 + max(col) for col in zip(*(matrix[i] for i in rows))]
+        for i in rows:
+            for c in self._excluded[self.letters[i]]:
+                scores[self._index[c]] = 0.0
+        return scores
+
+    def pick(self, word, count, rng):
+        """Return count distinct letters not in word, weighted by score."""
+        # Weighted sampling without replacement: the count largest
+        # u ** (1 / weight) keys (Efraimidis-Spirakis).
+        keyed = [(rng.random() ** (1.0 / s), c)
+                 for c, s in zip(self.letters, self.scores(word)) if s > 0]
+        keyed.sort(reverse=True)
+        return [c for _key, c in keyed[:count]]
@@ -2,7 +2,11 @@
 
 import csv
 import io
+import itertools
 import json
+import os
+import threading
+import time
 from datetime import datetime
 
 import gettext
@@ -14,124 +18,484 @@ APP_LABEL = _("Word Builder")
 AUTHOR = "Daniel Nylander"
 WEBSITE = "www.autismappar.se"
 
-import gi
-gi.require_version('Gtk', '4.0')
-gi.require_version('Adw', '1')
-from gi.repository import Gtk, Adw, Gio, GLib
+# The dialog helpers need GTK; the converters also work headless.
+try:
+    import gi
+    gi.require_version('Gtk', '4.0')
+    gi.require_version('Adw', '1')
+    from gi.repository import Gtk, Adw, Gio, GLib
+except Exception:
+    pass
+
+
+# Rows buffered per chunk by the streaming exporters.
+CHUNK_ROWS = 1000
+
+
+def iter_csv(results, score, chunk_rows=CHUNK_ROWS, header=True, footer=True):
+    """Yield training results as CSV text in chunks of chunk_rows rows.
+
+    Without header and footer the output is plain rows that can be
+    appended to an earlier export.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow([_("Word"), _("Difficulty"), _("Correct"), _("Attempts"), _("Date")])
+    yes, no = _("Yes"), _("No")
+    if hasattr(results, "rows"):
+        # ResultsStore: read the columns directly instead of building dicts.
+        rows = ((word, difficulty, yes if correct else no,
+                 1 if attempts is None else attempts, date or "")
+                for word, difficulty, correct, attempts, date in results.rows())
+    else:
+        rows = ((r.get("word", ""), r.get("difficulty", ""),
+                 yes if r.get("correct") else no,
+                 r.get("attempts", 1), r.get("date", ""))
+                for r in results)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % chunk_rows == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if footer:
+        writer.writerow([])
+        writer.writerow([_("Total score: %d") % score])
+        writer.writerow([f"{APP_LABEL} v{__version__} — {WEBSITE}"])
+    yield buf.getvalue()
+
+
+def iter_json(results, score, chunk_rows=CHUNK_ROWS):
+    """Yield training results as JSON text in chunks of chunk_rows records.
+
+    The output is identical to json.dumps(..., indent=2) of the whole
+    document, but only one chunk is held in memory at a time.
+    """
+    encoder = json.JSONEncoder(indent=2, ensure_ascii=False)
+    parts = ['{\n  "results": [']
+    count = 0
+    for r in results:
+        parts.append(("," if count else "") + "\n    "
+                     + encoder.encode(r).replace("\n", "\n    "))
+        count += 1
+        if count % chunk_rows == 0:
+            yield "".join(parts)
+            parts = []
+    parts.append("\n  ]" if count else "]")
+    trailer = {
+        "score": score,
+        "_exported_by": f"{APP_LABEL} v{__version__}",
+        "_author": AUTHOR,
+        "_website": WEBSITE,
+    }
+    for key, value in trailer.items():
+        parts.append(f",\n  {encoder.encode(key)}: {encoder.encode(value)}")
+    parts.append("\n}")
+    yield "".join(parts)
+
+
+def iter_jsonl(results, chunk_rows=CHUNK_ROWS):
+    """Yield training results as JSON Lines, one record per line."""
+    dumps = json.JSONEncoder(ensure_ascii=False).encode
+    lines = []
+    for r in results:
+        lines.append(dumps(r) + "\n")
+        if len(lines) == chunk_rows:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+def write_export(path, chunks):
+    """Write exporter chunks to path as they are produced."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+
+# Formats that can be appended to by export_since().
+INCREMENTAL_FORMATS = ("csv", "jsonl")
+
+
+def default_watermarks_path():
+    xdg = os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config"))
+    return os.path.join(xdg, "ordbyggaren", "export_watermarks.json")
+
+
+class ExportWatermarks:
+    """How much of a results history has been appended to each export file.
+
+    Marks are keyed by the file's resolved path, so appending to a second
+    file starts from the beginning instead of skipping what went to the
+    first. A mark holds the number of results already written, the last
+    written record and the profile, which are used to notice another
+    profile's history or one that was rewritten since (then the mark is
+    looked up again, or everything is exported). A missing or empty file
+    always gets everything.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_watermarks_path()
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def get(self, path):
+        """Return the stored {"count", "last", "profile", "format"} dict or None."""
+        return self._load().get(os.path.realpath(path))
+
+    def last_path(self, profile, fmt):
+        """The file most recently appended to for profile in fmt, or None."""
+        marks = [(mark.get("updated", 0), path) for path, mark in self._load().items()
+                 if mark.get("profile") == profile and mark.get("format") == fmt]
+        return max(marks)[1] if marks else None
+
+    def start(self, path, results, profile=None):
+        """Index of the first result not yet appended to path."""
+        try:
+            if not os.path.getsize(path):
+                return 0
+        except OSError:
+            return 0
+        mark = self.get(path)
+        if not mark or mark.get("profile") != profile:
+            return 0
+        count, last = mark.get("count", 0), mark.get("last")
+        if 0 < count <= len(results) and results[count - 1] == last:
+            return count
+        for i in range(min(count, len(results)) - 1, -1, -1):
+            if results[i] == last:
+                return i + 1
+        return 0
+
+    def update(self, path, fmt, results, profile=None):
+        """Mark every result as appended to path and save atomically."""
+        data = self._load()
+        data[os.path.realpath(path)] = {
+            "count": len(results),
+            "last": results[-1] if len(results) else None,
+            "profile": profile,
+            "format": fmt,
+            "updated": time.time(),
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def reset(self, path=None):
+        """Forget the mark for one file, or all of them."""
+        data = self._load()
+        if path is None:
+            data.clear()
+        else:
+            data.pop(os.path.realpath(path), None)
+
+
+def export_since(results, path, fmt, profile=None, watermarks=None):
+    """Append the results not yet appended to path.
+
+    CSV gets a header only when the file is new or empty. Returns the
+    number of results written.
+    """
+    if fmt not in INCREMENTAL_FORMATS:
+        raise ValueError(f"{fmt} cannot be appended to")
+    watermarks = watermarks or ExportWatermarks()
+    start = watermarks.start(path, results, profile)
+    new = itertools.islice(results, start, None)
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            chunks = iter_csv(new, 0, header=f.tell() == 0, footer=False)
+        else:
+            chunks = iter_jsonl(new)
+        for chunk in chunks:
+            f.write(chunk)
+    watermarks.update(path, fmt, results, profile)
+    return len(results) - start
 
 
 def results_to_csv(results, score):
     """Export training results as CSV."""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow([_("Word"), _("Difficulty"), _("Correct"), _("Attempts"), _("Date")])
-    for r in results:
-        writer.writerow([
-            r.get("word", ""),
-            r.get("difficulty", ""),
-            _("Yes") if r.get("correct") else _("No"),
-            r.get("attempts", 1),
-            r.get("date", ""),
-        ])
-    writer.writerow([])
-    writer.writerow([_("Total score: %d") % score])
-    writer.writerow([f"{APP_LABEL} v{__version__} — {WEBSITE}"])
-    return output.getvalue()
+    return "".join(iter_csv(results, score))
 
 
 def results_to_json(results, score):
     """Export training results as JSON."""
-    data = {
-        "results": results,
-        "score": score,
-        "_exported_by": f"{APP_LABEL} v{__version__}",
-        "_author": AUTHOR,
-        "_website": WEBSITE,
-    }
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    return "".join(iter_json(results, score))
+
+
+class ExportCancelled(Exception):
+    """Raised when an export is cancelled before it finishes."""
+
 
+# PDF page geometry (A4 in points) and table layout.
+PDF_WIDTH, PDF_HEIGHT = 595, 842
+PDF_COLUMNS = (40, 200, 340, 440)
+PDF_ROW_HEIGHT = 24
 
-def export_results_pdf(results, score, output_path):
-    """Export training results as PDF."""
+_GREEN = (0.18, 0.76, 0.49)
+_RED = (0.88, 0.11, 0.14)
+
+
+class _GlyphCache:
+    """Glyph runs per string, shaped once and translated for each cell."""
+
+    def __init__(self, scaled_font):
+        self._font = scaled_font
+        self._runs = {}
+
+    def place(self, text, x, y, out):
+        run = self._runs.get(text)
+        if run is None:
+            glyphs = self._font.text_to_glyphs(0, 0, text, False)
+            run = self._runs[text] = [(g[0], g[1], g[2]) for g in glyphs]
+        out.extend((index, gx + x, gy + y) for index, gx, gy in run)
+
+
+def export_results_pdf(results, score, output_path, progress=None, cancelled=None):
+    """Export training results as PDF.
+
+    Args:
+        progress: Optional callable(rows_done, rows_total) called per page.
+        cancelled: Optional callable returning True to stop; the partial
+            file is removed and ExportCancelled is raised.
+    """
+    cairo = _import_cairo()
+    if cairo is None:
+        return False
+    report = PdfReport(cairo, output_path, progress, cancelled)
+    report.add_section(_("Training Results"), results, score)
+    report.finish()
+    return True
+
+
+def _import_cairo():
     try:
         import cairo
     except ImportError:
         try:
             import cairocffi as cairo
         except ImportError:
-            return False
-
-    width, height = 595, 842
-    surface = cairo.PDFSurface(output_path, width, height)
-    ctx = cairo.Context(surface)
-
-    ctx.set_font_size(24)
-    ctx.move_to(40, 50)
-    ctx.show_text(_("Training Results"))
-
-    ctx.set_font_size(16)
-    ctx.move_to(40, 80)
-    ctx.show_text(_("Score: %d ⭐") % score)
-
-    ctx.set_font_size(12)
-    ctx.move_to(40, 100)
-    ctx.show_text(datetime.now().strftime("%Y-%m-%d"))
-
-    # Table header
-    y = 130
-    ctx.set_font_size(13)
-    ctx.set_source_rgb(0.3, 0.3, 0.3)
-    ctx.move_to(40, y)
-    ctx.show_text(_("Word"))
-    ctx.move_to(200, y)
-    ctx.show_text(_("Difficulty"))
-    ctx.move_to(340, y)
-    ctx.show_text(_("Correct"))
-    ctx.move_to(440, y)
-    ctx.show_text(_("Attempts"))
-
-    y += 10
-    ctx.set_line_width(0.5)
-    ctx.move_to(40, y)
-    ctx.line_to(width - 40, y)
-    ctx.stroke()
-
-    ctx.set_source_rgb(0, 0, 0)
-    ctx.set_font_size(12)
-
-    for r in results:
-        y += 24
-        if y > height - 40:
+            return None
+    return cairo
+
+
+class PdfReport:
+    """Results PDF made of one or more sections, each on a new page.
+
+    Each page is laid out first and then drawn with one show_glyphs()
+    call per colour, using fonts that are set up once.
+    """
+
+    def __init__(self, cairo, output_path, progress=None, cancelled=None):
+        self.path = output_path
+        self._progress = progress
+        self._cancelled = cancelled
+        self._surface = cairo.PDFSurface(output_path, PDF_WIDTH, PDF_HEIGHT)
+        self._ctx = cairo.Context(self._surface)
+        self._ctx.set_font_size(12)
+        self._glyphs = _GlyphCache(self._ctx.get_scaled_font())
+        self._today = datetime.now().strftime("%Y-%m-%d")
+        self._empty = True
+
+    def add_section(self, title, results, score):
+        """Draw a title, the score and a results table."""
+        ctx, surface = self._ctx, self._surface
+        if not self._empty:
             surface.show_page()
-            y = 40
-        ctx.move_to(40, y)
-        ctx.show_text(r.get("word", ""))
-        ctx.move_to(200, y)
-        ctx.show_text(r.get("difficulty", ""))
-        ctx.move_to(340, y)
-        if r.get("correct"):
-            ctx.set_source_rgb(0.18, 0.76, 0.49)
-            ctx.show_text("✓")
-        else:
-            ctx.set_source_rgb(0.88, 0.11, 0.14)
-            ctx.show_text("✗")
+        self._empty = False
+
         ctx.set_source_rgb(0, 0, 0)
-        ctx.move_to(440, y)
-        ctx.show_text(str(r.get("attempts", 1)))
+        ctx.set_font_size(24)
+        ctx.move_to(40, 50)
+        ctx.show_text(title)
+
+        ctx.set_font_size(16)
+        ctx.move_to(40, 80)
+        ctx.show_text(_("Score: %d ⭐") % score)
+
+        ctx.set_font_size(12)
+        ctx.move_to(40, 100)
+        ctx.show_text(self._today)
+
+        # Table header
+        y = 130
+        ctx.set_font_size(13)
+        ctx.set_source_rgb(0.3, 0.3, 0.3)
+        for x, label in zip(PDF_COLUMNS, (_("Word"), _("Difficulty"), _("Correct"), _("Attempts"))):
+            ctx.move_to(x, y)
+            ctx.show_text(label)
+
+        y += 10
+        ctx.set_line_width(0.5)
+        ctx.move_to(40, y)
+        ctx.line_to(PDF_WIDTH - 40, y)
+        ctx.stroke()
+
+        ctx.set_font_size(12)
+        glyphs = self._glyphs
+        total = len(results) if hasattr(results, "__len__") else None
+        black, green, red = [], [], []
+
+        def flush_page():
+            for colour, run in (((0, 0, 0), black), (_GREEN, green), (_RED, red)):
+                if run:
+                    ctx.set_source_rgb(*colour)
+                    ctx.show_glyphs(run)
+                    run.clear()
+
+        col_word, col_diff, col_correct, col_attempts = PDF_COLUMNS
+        done = 0
+        for r in results:
+            y += PDF_ROW_HEIGHT
+            if y > PDF_HEIGHT - 40:
+                flush_page()
+                surface.show_page()
+                y = 40
+                if self._progress:
+                    self._progress(done, total)
+                if self._cancelled and self._cancelled():
+                    self.abort()
+                    raise ExportCancelled()
+            glyphs.place(str(r.get("word", "")), col_word, y, black)
+            glyphs.place(str(r.get("difficulty", "")), col_diff, y, black)
+            if r.get("correct"):
+                glyphs.place("✓", col_correct, y, green)
+            else:
+                glyphs.place("✗", col_correct, y, red)
+            glyphs.place(str(r.get("attempts", 1)), col_attempts, y, black)
+            done += 1
+        flush_page()
+        if self._progress:
+            self._progress(done, total)
+
+    def finish(self):
+        """Draw the footer and close the file."""
+        ctx = self._ctx
+        ctx.set_font_size(9)
+        ctx.set_source_rgb(0.5, 0.5, 0.5)
+        footer = f"{APP_LABEL} v{__version__} — {WEBSITE} — {self._today}"
+        ctx.move_to(40, PDF_HEIGHT - 20)
+        ctx.show_text(footer)
+        self._surface.finish()
+
+    def abort(self):
+        """Close and remove a partly written file."""
+        self._surface.finish()
+        _remove(self.path)
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
 
-    # Footer
-    ctx.set_font_size(9)
-    ctx.set_source_rgb(0.5, 0.5, 0.5)
-    footer = f"{APP_LABEL} v{__version__} — {WEBSITE} — {datetime.now().strftime('%Y-%m-%d')}"
-    ctx.move_to(40, height - 20)
-    ctx.show_text(footer)
 
-    surface.finish()
-    return True
+class PdfExportJob:
+    """Runs export_results_pdf on a worker thread.
+
+    Progress and the final outcome are reported through status_callback on
+    the GTK main loop; cancel() stops the export at the next page. Only the
+    number of results is taken when the job is created; the worker reads
+    that many rows, so results the session appends meanwhile are left out.
+    """
+
+    def __init__(self, results, score, path, status_callback=None):
+        self.results = _Head(results, len(results))
+        self.score = score
+        self.path = path
+        self._status = status_callback
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pdf-export",
+                                        daemon=True)
 
+    def start(self):
+        _active_jobs.add(self)
+        self._thread.start()
+        return self
 
-def show_export_dialog(window, results, score, status_callback=None):
-    """Show export dialog."""
+    def cancel(self):
+        self._cancel.set()
+
+    def is_running(self):
+        return self._thread.is_alive()
+
+    def _report(self, msg):
+        if self._status:
+            GLib.idle_add(_call_once, self._status, msg)
+
+    def _progress(self, done, total):
+        if total:
+            self._report(_("Exporting PDF… %d%% (Esc to cancel)") % (100 * done // total))
+
+    def _run(self):
+        try:
+            success = export_results_pdf(self.results, self.score, self.path,
+                                         progress=self._progress,
+                                         cancelled=self._cancel.is_set)
+            if success:
+                self._report(_("PDF exported"))
+            else:
+                self._report(_("PDF export requires cairo."))
+        except ExportCancelled:
+            self._report(_("PDF export cancelled"))
+        except Exception as e:
+            self._report(_("Export error: %s") % str(e))
+        finally:
+            _active_jobs.discard(self)
+
+
+class _Head:
+    """The first n results of an append-only history, read lazily."""
+
+    def __init__(self, results, n):
+        self._results = results
+        self._n = n
+
+    def __len__(self):
+        return self._n
+
+    def __iter__(self):
+        return itertools.islice(self._results, self._n)
+
+
+_active_jobs = set()
+
+
+def cancel_pdf_exports():
+    """Cancel every running PDF export. Returns True if one was running."""
+    jobs = list(_active_jobs)
+    for job in jobs:
+        job.cancel()
+    return bool(jobs)
+
+
+def pdf_export_running():
+    return bool(_active_jobs)
+
+
+def _call_once(fn, *args):
+    fn(*args)
+    return False
+
+
+def show_export_dialog(window, results, score, status_callback=None, profile=None):
+    """Show export dialog.
+
+    results is the history the session logs to; profile names it for
+    incremental exports.
+    """
     dialog = Adw.AlertDialog.new(
         _("Export Training Results"),
         _("Choose export format:")
@@ -141,22 +505,32 @@ def show_export_dialog(window, results, score, status_callback=None):
     dialog.add_response("csv", _("CSV"))
     dialog.add_response("json", _("JSON"))
     dialog.add_response("pdf", _("PDF"))
+    dialog.add_response("new:csv", _("New Results (CSV)"))
+    dialog.add_response("new:jsonl", _("New Results (JSONL)"))
+    dialog.add_response("class", _("Class Report…"))
     dialog.set_default_response("csv")
     dialog.set_close_response("cancel")
 
-    dialog.connect("response", _on_export_response, window, results, score, status_callback)
+    dialog.connect("response", _on_export_response, window, results, score,
+                   status_callback, profile)
     dialog.present(window)
 
 
-def _on_export_response(dialog, response, window, results, score, status_callback):
+def _on_export_response(dialog, response, window, results, score, status_callback, profile):
     if response == "cancel":
         return
+    if response.startswith("new:"):
+        _save_since(window, results, response[4:], profile, status_callback)
+        return
     if response == "csv":
-        _save_text(window, results, score, "csv", results_to_csv, status_callback)
+        _save_text(window, results, score, "csv", iter_csv, status_callback)
     elif response == "json":
-        _save_text(window, results, score, "json", results_to_json, status_callback)
+        _save_text(window, results, score, "json", iter_json, status_callback)
     elif response == "pdf":
         _save_pdf(window, results, score, status_callback)
+    elif response == "class":
+        from ordbyggaren.class_report import show_class_report_dialog
+        show_class_report_dialog(window, status_callback)
 
 
 def _save_text(window, results, score, ext, converter, status_callback):
@@ -172,8 +546,7 @@ def _on_text_done(dialog, result, results, score, converter, ext, status_callbac
     except GLib.Error:
         return
     try:
-        with open(gfile.get_path(), "w") as f:
-            f.write(converter(results, score))
+        write_export(gfile.get_path(), converter(results, score))
         if status_callback:
             status_callback(_("Exported %s") % ext.upper())
     except Exception as e:
@@ -181,6 +554,33 @@ def _on_text_done(dialog, result, results, score, converter, ext, status_callbac
             status_callback(_("Export error: %s") % str(e))
 
 
+def _save_since(window, results, fmt, profile, status_callback):
+    watermarks = ExportWatermarks()
+    dialog = Gtk.FileDialog.new()
+    dialog.set_title(_("Append New Results"))
+    last = watermarks.last_path(profile, fmt)
+    if last and os.path.exists(last):
+        dialog.set_initial_file(Gio.File.new_for_path(last))
+    else:
+        dialog.set_initial_name(f"ordbyggaren_{profile or 'results'}.{fmt}")
+    dialog.save(window, None, _on_since_done, results, fmt, profile, watermarks,
+                status_callback)
+
+
+def _on_since_done(dialog, result, results, fmt, profile, watermarks, status_callback):
+    try:
+        gfile = dialog.save_finish(result)
+    except GLib.Error:
+        return
+    try:
+        count = export_since(results, gfile.get_path(), fmt, profile, watermarks)
+        if status_callback:
+            status_callback(_("Appended %d new results") % count)
+    except Exception as e:
+        if status_callback:
+            status_callback(_("Export error: %s") % str(e))
+
+
 def _save_pdf(window, results, score, status_callback):
     dialog = Gtk.FileDialog.new()
     dialog.set_title(_("Save PDF"))
@@ -193,12 +593,4 @@ def _on_pdf_done(dialog, result, results, score, status_callback):
         gfile = dialog.save_finish(result)
     except GLib.Error:
         return
-    try:
-        success = export_results_pdf(results, score, gfile.get_path())
-        if success and status_callback:
-            status_callback(_("PDF exported"))
-        elif not success and status_callback:
-            status_callback(_("PDF export requires cairo."))
-    except Exception as e:
-        if status_callback:
-            status_callback(_("Export error: %s") % str(e))
+    PdfExportJob(results, score, gfile.get_path(), status_callback).start()
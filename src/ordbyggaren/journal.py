@@ -0,0 +1,177 @@
+"""Append-only JSONL journal of training results."""
+import json
+import os
+import threading
+
+from ordbyggaren.results_store import ResultsStore
+
+
+class ResultsJournal:
+    """Results history stored as one JSON object per line.
+
+    Each append writes and fsyncs a single line, so logging an attempt
+    costs O(1) no matter how long the history is. A line torn by a crash
+    is skipped on load and removed by the next compaction, which rewrites
+    the file in the background and swaps it in atomically.
+    """
+
+    def __init__(self, path, legacy_paths=()):
+        self.path = str(path)
+        self._legacy = [str(p) for p in legacy_paths]
+        self._lock = threading.Lock()
+        self._file = None
+        self._compactor = None
+        self.corrupt = 0
+
+    def load(self):
+        """Return every record as a ResultsStore, importing legacy
+        results.json files first."""
+        if not os.path.exists(self.path):
+            self._import_legacy()
+        records = ResultsStore()
+        self.corrupt = 0
+        try:
+            # Lines are parsed as bytes so a torn UTF-8 character only
+            # spoils its own line.
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    record = _parse(line)
+                    if record is None:
+                        if line.strip():
+                            self.corrupt += 1
+                        continue
+                    records.append(record)
+        except FileNotFoundError:
+            pass
+        if self.corrupt:
+            self.compact_async()
+        return records
+
+    def _import_legacy(self):
+        records = []
+        imported = []
+        for path in self._legacy:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if isinstance(data, dict):
+                data = data.get('results', [])
+            records.extend(r for r in data if isinstance(r, dict))
+            imported.append(path)
+        if not imported:
+            return
+        self._write_atomic(records)
+        for path in imported:
+            try:
+                os.replace(path, path + '.imported')
+            except OSError:
+                pass
+
+    def append(self, record):
+        """Durably append one record."""
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            f = self._open()
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            # Terminate a line left unfinished by a crash. The last byte is
+            # read in binary: it may be in the middle of a UTF-8 character.
+            with open(self.path, 'ab+') as f:
+                if f.seek(0, os.SEEK_END):
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def compact(self):
+        """Rewrite the journal without unreadable lines.
+
+        The bulk of the file is copied without holding the lock; only
+        lines appended meanwhile are copied under it before the swap.
+        """
+        with self._lock:
+            try:
+                end = os.path.getsize(self.path)
+            except OSError:
+                return
+        tmp = self.path + '.compact'
+        with open(self.path, 'rb') as src, open(tmp, 'wb') as dst:
+            for line in _lines_until(src, end):
+                if _parse(line) is not None:
+                    dst.write(line.rstrip(b'\r\n') + b'\n')
+            with self._lock:
+                src.seek(end)
+                for line in src:
+                    if _parse(line) is not None:
+                        dst.write(line.rstrip(b'\r\n') + b'\n')
+                dst.flush()
+                os.fsync(dst.fileno())
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                os.replace(tmp, self.path)
+                _fsync_dir(self.path)
+        self.corrupt = 0
+
+    def compact_async(self):
+        """Compact on a background thread unless one is already running."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return self._compactor
+        self._compactor = threading.Thread(target=self.compact,
+                                           name='journal-compact', daemon=True)
+        self._compactor.start()
+        return self._compactor
+
+    def _write_atomic(self, records):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        _fsync_dir(self.path)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _parse(line):
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def _lines_until(f, end):
+    while f.tell() < end:
+        line = f.readline()
+        if not line:
+            break
+        yield line
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
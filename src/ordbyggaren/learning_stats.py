@@ -0,0 +1,154 @@
+"""Learning statistics over the results history.
+
+Accuracy per word, per letter position and per confused letter pair
+(the letter that belonged in a slot and the distractor placed there), plus
+accuracy per day. A ResultsStore history is aggregated over its columns,
+with NumPy when it is installed; after that each logged result updates
+the counters in O(word length), so a view never rescans the history.
+"""
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_MISSING = -1
+
+
+class LearningStats:
+    """Incrementally maintained counters for the statistics view."""
+
+    def __init__(self):
+        self.seen = 0
+        self.correct = 0
+        self.word_seen = Counter()
+        self.word_correct = Counter()
+        self.position_seen = Counter()
+        self.position_correct = Counter()
+        self.pairs = Counter()
+        self.day_seen = Counter()
+        self.day_correct = Counter()
+        self.version = 0
+        self.pairs_version = 0
+
+    @classmethod
+    def from_results(cls, results):
+        """Aggregate a whole history once."""
+        stats = cls()
+        if hasattr(results, 'columns'):
+            stats._add_store(results)
+        else:
+            for r in results:
+                stats.add(r)
+        return stats
+
+    def add(self, record):
+        """Count one result dict (as logged by GameSession)."""
+        date = record.get('date')
+        self._add(record.get('word', ''), bool(record.get('correct')),
+                  record.get('answer'), date[:10] if isinstance(date, str) else None)
+
+    def _add(self, word, correct, answer, day, count=1):
+        self.seen += count
+        self.word_seen[word] += count
+        if correct:
+            self.correct += count
+            self.word_correct[word] += count
+        if day:
+            self.day_seen[day] += count
+            if correct:
+                self.day_correct[day] += count
+        if answer is not None:
+            # A correct answer may be another real word; that is no mix-up.
+            self._add_answer(word, word if correct else answer, count)
+        self.version += 1
+
+    def _add_answer(self, word, answer, count):
+        word = word.upper()
+        for position, (expected, got) in enumerate(zip(word, answer.upper())):
+            self.position_seen[position] += count
+            if expected == got:
+                self.position_correct[position] += count
+            elif got not in word:
+                # A letter of the word in the wrong place is an ordering
+                # error; only a letter from outside the word is a mix-up.
+                self.pairs[expected, got] += count
+                self.pairs_version += 1
+
+    def _add_store(self, store):
+        if not len(store):
+            return
+        if np is None:
+            words, answers = store.words, store.answers
+            for w, c, m, a in zip(store.word_ids, store.correct, store.minutes,
+                                  store.answer_ids):
+                self._add(words[w], c == 1, None if a == _MISSING else answers[a],
+                          store._date(m)[:10] if m != _MISSING else None)
+            return
+
+        cols = store.columns()
+        word_id = cols['word_id'].astype(np.int64)
+        ok = cols['correct'] == 1
+        n_words = len(store.words)
+        seen = np.bincount(word_id, minlength=n_words)
+        right = np.bincount(word_id, weights=ok.astype(float), minlength=n_words).astype(np.int64)
+        for i in np.flatnonzero(seen):
+            self.word_seen[store.words[i]] += int(seen[i])
+            if right[i]:
+                self.word_correct[store.words[i]] += int(right[i])
+        self.seen += len(word_id)
+        self.correct += int(ok.sum())
+
+        minutes = cols['minutes']
+        dated = minutes != _MISSING
+        if dated.any():
+            days = minutes[dated] // 1440
+            unique_days, index = np.unique(days, return_inverse=True)
+            day_seen = np.bincount(index)
+            day_right = np.bincount(index, weights=ok[dated].astype(float)).astype(np.int64)
+            for day, n, k in zip(unique_days, day_seen, day_right):
+                label = store._date(int(day) * 1440)[:10]
+                self.day_seen[label] += int(n)
+                if k:
+                    self.day_correct[label] += int(k)
+
+        # Letter positions and pairs only depend on (word, answer, correct),
+        # so each distinct triple is compared once and weighted by its count.
+        answer_id = cols['answer_id'].astype(np.int64)
+        answered = answer_id != _MISSING
+        if answered.any():
+            keys = (word_id[answered] * len(store.answers) + answer_id[answered]) * 2 \
+                + ok[answered]
+            unique_keys, counts = np.unique(keys, return_counts=True)
+            for key, count in zip(unique_keys, counts):
+                pair, right = divmod(int(key), 2)
+                w, a = divmod(pair, len(store.answers))
+                word = store.words[w]
+                self._add_answer(word, word if right else store.answers[a], int(count))
+        self.version += 1
+
+    def accuracy(self):
+        return self.correct / self.seen if self.seen else 0.0
+
+    def word_accuracy(self, min_seen=1):
+        """(word, seen, correct, accuracy) rows, least accurate first."""
+        rows = [(word, n, self.word_correct[word], self.word_correct[word] / n)
+                for word, n in self.word_seen.items() if n >= min_seen and word]
+        rows.sort(key=lambda row: (row[3], -row[1], row[0]))
+        return rows
+
+    def position_accuracy(self):
+        """(position, seen, correct, accuracy) rows; position 0 is the first letter."""
+        return [(p, n, self.position_correct[p], self.position_correct[p] / n)
+                for p, n in sorted(self.position_seen.items())]
+
+    def confused_pairs(self, limit=10):
+        """(expected, placed, count) for the most common letter mix-ups."""
+        return [(expected, got, n) for (expected, got), n in self.pairs.most_common(limit)]
+
+    def trend(self, days=None):
+        """(day, seen, correct, accuracy) rows in date order, the last days only."""
+        rows = [(day, n, self.day_correct[day], self.day_correct[day] / n)
+                for day, n in sorted(self.day_seen.items())]
+        return rows[-days:] if days else rows
@@ -0,0 +1,366 @@
+"""Indexed word lexicons.
+
+A compiled lexicon (.oblex) is a single little-endian file that is
+memory-mapped on open:
+
+    header      magic, entry count, index count, section offsets
+    records     one fixed-size record per entry
+    strings     UTF-8 fields of every entry, separated by 0x1f
+    indexes     per index: sorted 64-bit key hashes, bucket offsets and
+                counts, and the entry ids of every bucket
+
+Nothing is parsed up front. Looking up a bucket is a binary search over
+the key hashes and picking a random entry from it is O(1).
+"""
+import argparse
+import bisect
+import csv
+import hashlib
+import mmap
+import os
+import random
+import struct
+import sys
+import unicodedata
+from collections import namedtuple
+
+MAGIC = b'OBLEX\x00\x01\x00'
+EXTENSION = '.oblex'
+
+LexiconEntry = namedtuple('LexiconEntry', 'word emoji image difficulty syllables ipa')
+
+# Indexes stored in every compiled lexicon.
+INDEXES = ('word', 'length', 'difficulty', 'difficulty_length', 'letters', 'onset')
+
+_HEADER = struct.Struct('<8sIIQQ')          # magic, entries, indexes, records, strings
+_INDEX_DIR = struct.Struct('<24sIQQQQ')     # name, keys, hashes, offsets, counts, postings
+_RECORD = struct.Struct('<IIBBBx')          # string offset, length, difficulty, length, syllables
+_SEP = '\x1f'
+
+
+def letters_key(word):
+    """Return the letter multiset of a word as a sorted string."""
+    return ''.join(sorted(word.lower()))
+
+
+def onset(entry):
+    """Return the leading sound of an entry: the first IPA segment with
+    its diacritics, or the first letter when there is no IPA."""
+    ipa = ''.join(ch for ch in (entry.ipa or '') if ch not in "ˈˌː.'/ ")
+    if not ipa:
+        return entry.word[:1].lower()
+    seg = ipa[0]
+    for ch in ipa[1:]:
+        if not unicodedata.combining(ch):
+            break
+        seg += ch
+    return seg
+
+
+def index_keys(entry):
+    """Return {index name: key} for an entry."""
+    return {
+        'word': entry.word,
+        'length': str(len(entry.word)),
+        'difficulty': str(entry.difficulty),
+        'difficulty_length': f'{entry.difficulty}:{len(entry.word)}',
+        'letters': letters_key(entry.word),
+        'onset': onset(entry),
+    }
+
+
+def _hash(key):
+    return int.from_bytes(
+        hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _filter_keys(length=None, difficulty=None, letters=None, sound=None):
+    """Translate query filters into (index, key) pairs, most selective first."""
+    keys = []
+    if letters is not None:
+        keys.append(('letters', letters_key(letters)))
+    if difficulty is not None and length is not None:
+        keys.append(('difficulty_length', f'{difficulty}:{length}'))
+    elif length is not None:
+        keys.append(('length', str(length)))
+    elif difficulty is not None:
+        keys.append(('difficulty', str(difficulty)))
+    if sound is not None:
+        keys.append(('onset', sound))
+    return keys
+
+
+class _LexiconBase:
+    """Query API shared by compiled and in-memory lexicons."""
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def words(self):
+        return [entry.word for entry in self]
+
+    def _bucket(self, index, key):
+        raise NotImplementedError
+
+    def find(self, word):
+        """Return the entry for a word, or None."""
+        for i in self._bucket('word', word):
+            entry = self[i]
+            if entry.word == word:
+                return entry
+        return None
+
+    def ids(self, **filters):
+        """Return the entry ids matching every filter.
+
+        Filters: length, difficulty, letters (any word with the same letter
+        multiset) and sound (leading IPA segment).
+        """
+        keys = _filter_keys(**filters)
+        if not keys:
+            return range(len(self))
+        buckets = sorted((self._bucket(index, key) for index, key in keys), key=len)
+        if len(buckets) == 1:
+            return buckets[0]
+        rest = [set(b) for b in buckets[1:]]
+        return [i for i in buckets[0] if all(i in r for r in rest)]
+
+    def count(self, **filters):
+        return len(self.ids(**filters))
+
+    def random(self, rng=random, **filters):
+        """Return a random entry matching the filters, or None.
+
+        A filter combination with its own index is answered in O(1);
+        other combinations sample the smallest bucket and only fall back
+        to intersecting buckets if sampling keeps missing.
+        """
+        keys = _filter_keys(**filters)
+        if not keys:
+            return self[rng.randrange(len(self))] if len(self) else None
+        buckets = sorted((self._bucket(index, key) for index, key in keys), key=len)
+        smallest = buckets[0]
+        if not smallest:
+            return None
+        for _attempt in range(8):
+            entry = self[smallest[rng.randrange(len(smallest))]]
+            if _matches(entry, **filters):
+                return entry
+        ids = [i for i in self.ids(**filters) if _matches(self[i], **filters)]
+        return self[rng.choice(ids)] if ids else None
+
+
+def _matches(entry, length=None, difficulty=None, letters=None, sound=None):
+    return ((length is None or len(entry.word) == length)
+            and (difficulty is None or entry.difficulty == difficulty)
+            and (letters is None or letters_key(entry.word) == letters_key(letters))
+            and (sound is None or onset(entry) == sound))
+
+
+class Lexicon(_LexiconBase):
+    """A compiled, memory-mapped lexicon file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mm)
+        magic, self._count, n_indexes, self._records, self._strings = \
+            _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f'{path}: not an Ordbyggaren lexicon')
+        self._indexes = {}
+        pos = _HEADER.size
+        for _i in range(n_indexes):
+            name, n_keys, hashes, offsets, counts, postings = \
+                _INDEX_DIR.unpack_from(self._buf, pos)
+            pos += _INDEX_DIR.size
+            self._indexes[name.rstrip(b'\0').decode('ascii')] = (
+                self._buf[hashes:hashes + 8 * n_keys].cast('Q'),
+                self._buf[offsets:offsets + 4 * n_keys].cast('I'),
+                self._buf[counts:counts + 4 * n_keys].cast('I'),
+                postings,
+            )
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        offset, size, difficulty, _length, _syllables = _RECORD.unpack_from(
+            self._buf, self._records + i * _RECORD.size)
+        start = self._strings + offset
+        word, emoji, image, syllables, ipa = \
+            bytes(self._buf[start:start + size]).decode('utf-8').split(_SEP)
+        return LexiconEntry(word, emoji, image, difficulty,
+                            tuple(syllables.split('-')) if syllables else (), ipa)
+
+    def _bucket(self, index, key):
+        if index not in self._indexes:
+            return ()
+        hashes, offsets, counts, postings = self._indexes[index]
+        h = _hash(key)
+        k = bisect.bisect_left(hashes, h)
+        if k == len(hashes) or hashes[k] != h:
+            return ()
+        start = postings + offsets[k] * 4
+        return self._buf[start:start + counts[k] * 4].cast('I')
+
+    def close(self):
+        self._indexes = {}
+        try:
+            self._buf.release()
+            self._mm.close()
+        except BufferError:
+            pass  # buckets still referenced; the map closes when they go
+
+
+class MemoryLexicon(_LexiconBase):
+    """The same query API over a list of entries held in memory."""
+
+    def __init__(self, entries):
+        self._entries = list(entries)
+        self._indexes = {name: {} for name in INDEXES}
+        for i, entry in enumerate(self._entries):
+            for name, key in index_keys(entry).items():
+                self._indexes[name].setdefault(key, []).append(i)
+
+    @classmethod
+    def from_words(cls, words):
+        """Build from a {difficulty label: [(word, emoji), ...]} dict."""
+        return cls(LexiconEntry(word, emoji, '', level, (), '')
+                   for level, pairs in enumerate(words.values())
+                   for word, emoji in pairs)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, i):
+        return self._entries[i]
+
+    def _bucket(self, index, key):
+        return self._indexes[index].get(key, ())
+
+
+def _align(out, n=8):
+    pad = -len(out) % n
+    out.extend(b'\0' * pad)
+
+
+def build_lexicon(entries, path):
+    """Compile entries into a lexicon file at path (written atomically)."""
+    entries = list(entries)
+    strings = bytearray()
+    records = bytearray()
+    buckets = {name: {} for name in INDEXES}
+    for i, entry in enumerate(entries):
+        fields = [entry.word, entry.emoji or '', entry.image or '',
+                  '-'.join(entry.syllables), entry.ipa or '']
+        if any(_SEP in f for f in fields):
+            raise ValueError(f'{entry.word!r}: field contains a separator')
+        blob = _SEP.join(fields).encode('utf-8')
+        records += _RECORD.pack(len(strings), len(blob), entry.difficulty,
+                                min(len(entry.word), 255), min(len(entry.syllables), 255))
+        strings += blob
+        for name, key in index_keys(entry).items():
+            buckets[name].setdefault(_hash(key), []).append(i)
+
+    out = bytearray(_HEADER.size + _INDEX_DIR.size * len(INDEXES))
+    _align(out)
+    records_at = len(out)
+    out += records
+    strings_at = len(out)
+    out += strings
+    directory = []
+    for name in INDEXES:
+        table = sorted(buckets[name].items())
+        _align(out)
+        hashes_at = len(out)
+        out += struct.pack(f'<{len(table)}Q', *(h for h, _ids in table))
+        offsets, counts, postings = [], [], []
+        for _h, ids in table:
+            offsets.append(len(postings))
+            counts.append(len(ids))
+            postings.extend(ids)
+        offsets_at = len(out)
+        out += struct.pack(f'<{len(table)}I', *offsets)
+        counts_at = len(out)
+        out += struct.pack(f'<{len(table)}I', *counts)
+        postings_at = len(out)
+        out += struct.pack(f'<{len(postings)}I', *postings)
+        directory.append(_INDEX_DIR.pack(name.encode('ascii'), len(table), hashes_at,
+                                         offsets_at, counts_at, postings_at))
+    _HEADER.pack_into(out, 0, MAGIC, len(entries), len(INDEXES), records_at, strings_at)
+    out[_HEADER.size:_HEADER.size + len(directory) * _INDEX_DIR.size] = b''.join(directory)
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(out)
+    os.replace(tmp, path)
+
+
+def read_tsv(path, fill_ipa=False, lang='sv'):
+    """Read entries from a tab-separated file.
+
+    Columns: word, emoji, difficulty (0-2), syllables (hyphenated),
+    IPA, image path. Only the word is required. With fill_ipa, missing
+    transcriptions are filled in with one batched espeak-ng run.
+    """
+    entries = []
+    with open(path, encoding='utf-8', newline='') as f:
+        for row in csv.reader(f, delimiter='\t'):
+            if not row or not row[0].strip() or row[0].startswith('#'):
+                continue
+            row += [''] * (6 - len(row))
+            word, emoji, difficulty, syllables, ipa, image = (c.strip() for c in row[:6])
+            entries.append(LexiconEntry(
+                word, emoji, image, int(difficulty or 0),
+                tuple(syllables.split('-')) if syllables else (), ipa))
+    if fill_ipa:
+        from ordbyggaren.phonetics import get_phonetics_batch
+        ipa = get_phonetics_batch([e.word for e in entries if not e.ipa], lang)
+        entries = [e if e.ipa else e._replace(ipa=ipa.get(e.word, '')) for e in entries]
+    return entries
+
+
+def lexicon_paths():
+    """Return the places a compiled lexicon is looked for, in order."""
+    data_home = os.environ.get('XDG_DATA_HOME', os.path.expanduser('~/.local/share'))
+    data_dirs = os.environ.get('XDG_DATA_DIRS', '/usr/local/share:/usr/share')
+    return [os.path.join(d, 'ordbyggaren', 'lexicon' + EXTENSION)
+            for d in [data_home] + data_dirs.split(':') if d]
+
+
+def load_default(words=None):
+    """Open the first installed lexicon, or wrap the built-in word list."""
+    for path in lexicon_paths():
+        if os.path.exists(path):
+            try:
+                return Lexicon(path)
+            except (OSError, ValueError):
+                continue
+    if words is None:
+        from ordbyggaren.words import WORDS as words
+    return MemoryLexicon.from_words(words)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m ordbyggaren.lexicon',
+        description='Compile a tab-separated word list into a lexicon file.')
+    parser.add_argument('source', help='TSV: word, emoji, difficulty, syllables, ipa, image')
+    parser.add_argument('output', help='output file (' + EXTENSION + ')')
+    parser.add_argument('--ipa', action='store_true', help='fill in missing IPA with espeak-ng')
+    parser.add_argument('--lang', default='sv')
+    args = parser.parse_args(argv)
+    entries = read_tsv(args.source, fill_ipa=args.ipa, lang=args.lang)
+    build_lexicon(entries, args.output)
+    print(f'{args.output}: {len(entries)} entries')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,6 +7,7 @@ gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
 from gi.repository import Gtk, Adw, Gio, GLib
 from ordbyggaren import __version__
+from ordbyggaren import sound_bank, speech_queue, speech_worker
 from ordbyggaren.window import OrdbyggarenWindow
 from ordbyggaren.accessibility import apply_large_text
 from ordbyggaren.accessibility import AccessibilityManager
@@ -37,8 +38,8 @@ def _save_settings(s):
 class OrdbyggarenApp(Adw.Application):
     def __init__(self):
         super().__init__(application_id="se.yeager.ordbyggaren",
-        GLib.set_application_name(_("Word Builder"))
                          flags=Gio.ApplicationFlags.DEFAULT_FLAGS)
+        GLib.set_application_name(_("Word Builder"))
 
     def do_activate(self):
         apply_large_text()
@@ -51,6 +52,12 @@ class OrdbyggarenApp(Adw.Application):
         Adw.Application.do_startup(self)
         self._setup_actions()
 
+    def do_shutdown(self):
+        speech_queue.shutdown()
+        speech_worker.shutdown()
+        sound_bank.shutdown()
+        Adw.Application.do_shutdown(self)
+
     def _setup_actions(self):
         quit_action = Gio.SimpleAction.new("quit", None)
         quit_action.connect("activate", lambda *_: self.quit())
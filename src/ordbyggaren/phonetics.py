@@ -1,92 +1,351 @@
 """Phonetics/TTS support using Piper (preferred) or espeak-ng."""
+import json
 import subprocess
-import shutil
 import os
-import tempfile
+import threading
+import time
+import wave
+
+from ordbyggaren import speech_cache, speech_worker, voices
 
 
 def has_piper():
     """Check if Piper TTS is available."""
-    return shutil.which('piper') is not None
+    return voices.get_registry().has_engine('piper')
 
 
 def has_espeak():
     """Check if espeak-ng is available."""
-    return shutil.which('espeak-ng') is not None
+    return voices.get_registry().has_engine('espeak')
 
 
-def speak(text, lang='sv', engine=None):
+def speak(text, lang='sv', engine=None, stream=None):
     """Speak text using Piper (first) or espeak-ng (fallback).
-    
+
+    Audio is taken from the speech cache when the same text has been
+    rendered before. Synthesizing a cache miss blocks, so UI code queues
+    text on speech_queue.get_scheduler() instead of calling this.
+
     Args:
         text: Text to speak
         lang: Language code (default: sv for Swedish)
         engine: Force 'piper' or 'espeak'. None = auto-detect.
+        stream: Pipe raw Piper audio straight to the player instead of
+            going through a WAV file and the cache. By default Piper
+            streams only text that is not cached yet, so a cache miss
+            starts playing with the first synthesized chunk; the same
+            audio is then stored in the cache.
+
+    Returns:
+        A playback handle with wait() and terminate(), or None.
     """
     if not text:
-        return
+        return None
+
+    if engine is None:
+        engine = voices.get_registry().default_engine()
+
+    start = time.monotonic()
+    cached = _is_cached(text, lang, engine)
+    if stream is None:
+        stream = not cached
+    if stream and engine == 'piper':
+        try:
+            piper = speech_worker.get_stream(_find_piper_model(lang))
+            # The streamed audio is also cached, so later requests play the
+            # file and the text is rendered only once.
+            handle = piper.say(text, None if cached else
+                               lambda pcm: _store_pcm(text, lang, pcm, piper.sample_rate))
+            if handle is not None:
+                return handle
+        except (FileNotFoundError, OSError):
+            pass
+
+    wav_path = synthesize(text, lang, engine)
+    if not wav_path:
+        return _speak_espeak(text, lang)
+
+    def heard(when):
+        speech_worker.first_audio['file'].record(when - start, cold=not cached)
 
+    return _play_file(wav_path, heard)
+
+
+def synthesize(text, lang='sv', engine=None):
+    """Return the path of a cached WAV rendering of text, or None."""
+    if not text:
+        return None
     if engine is None:
-        engine = 'piper' if has_piper() else 'espeak' if has_espeak() else None
+        engine = voices.get_registry().default_engine()
 
     if engine == 'piper':
-        _speak_piper(text, lang)
-    elif engine == 'espeak':
-        _speak_espeak(text, lang)
+        model = _find_piper_model(lang)
+        path = speech_cache.get_cache().get_or_render(
+            'piper', _voice_for('piper', lang), lang, text,
+            lambda dest: _render_piper(text, model, dest))
+        if path:
+            return path
+        engine = 'espeak'
+    if engine == 'espeak':
+        return speech_cache.get_cache().get_or_render(
+            'espeak', _voice_for('espeak', lang), lang, text,
+            lambda dest: _render_espeak(text, lang, dest))
+    return None
+
+
+def prewarm(words, lang='sv', engine=None):
+    """Render a word list into the speech cache on a background thread."""
+    words = list(words)
+
+    def run():
+        for word in words:
+            synthesize(word, lang, engine)
+
+    thread = threading.Thread(target=run, name='speech-prewarm', daemon=True)
+    thread.start()
+    return thread
+
+
+def _find_piper_model(lang):
+    return voices.get_registry().model_for(lang)
 
 
-def _speak_piper(text, lang):
-    """Speak using Piper TTS."""
+def _store_pcm(text, lang, pcm, rate):
+    """Keep streamed Piper audio in the speech cache as a WAV file."""
+    speech_cache.get_cache().put(
+        'piper', _voice_for('piper', lang), lang, text,
+        lambda dest: speech_worker.write_wav(dest, pcm, rate))
+
+
+def _render_piper(text, model, dest):
+    """Render using a persistent Piper worker."""
     try:
-        # Find Piper model
-        model_dir = os.path.expanduser('~/.local/share/piper/voices')
-        model = None
-        if os.path.isdir(model_dir):
-            for f in os.listdir(model_dir):
-                if f.startswith(lang) and f.endswith('.onnx'):
-                    model = os.path.join(model_dir, f)
-                    break
-
-        cmd = ['piper', '--output-raw']
-        if model:
-            cmd.extend(['--model', model])
-
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
-            tmp_path = tmp.name
-
-        proc = subprocess.Popen(
-            ['piper', '--output_file', tmp_path] + (['--model', model] if model else []),
-            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        return speech_worker.get_worker(model).synthesize(text, dest)
+    except (FileNotFoundError, OSError):
+        return False
+
+
+def _render_espeak(text, lang, dest):
+    try:
+        result = subprocess.run(
+            ['espeak-ng', '-v', lang, '-w', dest, text],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10
         )
-        proc.communicate(input=text.encode('utf-8'))
+        return result.returncode == 0
+    except (FileNotFoundError, OSError, subprocess.TimeoutExpired):
+        return False
 
-        if os.path.exists(tmp_path) and os.path.getsize(tmp_path) > 0:
-            subprocess.Popen(
-                ['paplay', tmp_path],
-                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-            )
+
+def _voice_for(engine, lang):
+    """Return the voice part of the speech cache key."""
+    if engine == 'piper':
+        model = _find_piper_model(lang)
+        return os.path.basename(model) if model else ''
+    return lang
+
+
+def _is_cached(text, lang, engine):
+    return speech_cache.get_cache().contains(
+        engine, _voice_for(engine, lang), lang, text)
+
+
+def _play_file(path, on_first_audio=None):
+    """Play a WAV file, reporting when its first audio is heard.
+
+    Files that are not 16-bit mono go to paplay unmeasured.
+    """
+    try:
+        return speech_worker.WavPlayback(path, on_first_audio)
+    except (OSError, EOFError, ValueError, wave.Error):
+        pass
+    try:
+        return subprocess.Popen(
+            ['paplay', path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
     except (FileNotFoundError, OSError):
-        _speak_espeak(text, lang)
+        return None
 
 
 def _speak_espeak(text, lang):
     """Speak using espeak-ng (fallback)."""
     try:
-        subprocess.Popen(
+        return subprocess.Popen(
             ['espeak-ng', '-v', lang, text],
             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
         )
     except (FileNotFoundError, OSError):
-        pass
+        return None
 
 
 def get_phonetics(word, lang='sv'):
     """Get IPA phonetic transcription of a word."""
+    return get_phonetics_batch([word], lang).get(word, '')
+
+
+def get_phonetics_batch(words, lang='sv'):
+    """Get IPA transcriptions for many words as a {word: ipa} dict.
+
+    Words that are not in the memo table are sent through a single
+    espeak-ng run, one sentence per line, and the result is memoized per
+    voice and espeak-ng version.
+    """
+    words = [w for w in dict.fromkeys(words) if w and w.strip()]
+    memo = _ipa_memo()
+    known = memo.lookup(lang, words)
+    missing = [w for w in words if w not in known]
+    if missing:
+        found = _transcribe(missing, lang)
+        memo.update(lang, found)
+        known.update(found)
+    return known
+
+
+def _transcribe(words, lang):
+    """Run espeak-ng once for all words; fall back to one run per word if
+    the output cannot be split unambiguously."""
+    text = ''.join(' '.join(w.split()) + '.\n' for w in words)
     try:
         result = subprocess.run(
-            ['espeak-ng', '-v', lang, '--ipa', '-q', word],
-            capture_output=True, text=True, timeout=5
+            ['espeak-ng', '-v', lang, '--ipa', '-q', '--stdin'],
+            input=text, capture_output=True, text=True,
+            timeout=5 + 0.05 * len(words)
         )
-        return result.stdout.strip()
     except (FileNotFoundError, subprocess.TimeoutExpired):
-        return ''
+        return {}
+    lines = [line.strip() for line in result.stdout.splitlines() if line.strip()]
+    if len(lines) == len(words):
+        return dict(zip(words, lines))
+    found = {}
+    for word in words:
+        try:
+            result = subprocess.run(
+                ['espeak-ng', '-v', lang, '--ipa', '-q', word],
+                capture_output=True, text=True, timeout=5
+            )
+        except (FileNotFoundError, subprocess.TimeoutExpired):
+            continue
+        found[word] = result.stdout.strip()
+    return found
+
+
+def espeak_version():
+    """Return the espeak-ng version string ('' if not installed)."""
+    global _espeak_version
+    if _espeak_version is None:
+        try:
+            result = subprocess.run(['espeak-ng', '--version'],
+                                    capture_output=True, text=True, timeout=5)
+            _espeak_version = result.stdout.strip()
+        except (FileNotFoundError, OSError, subprocess.TimeoutExpired):
+            _espeak_version = ''
+    return _espeak_version
+
+
+_espeak_version = None
+
+
+# The IPA memo is a JSON snapshot plus a log with one JSON line per
+# update; the log is folded into the snapshot once it grows past this.
+MEMO_LOG_LIMIT = 256 * 1024
+
+
+class _IpaMemo:
+    """Persistent word -> IPA table, invalidated when espeak-ng changes.
+
+    New transcriptions are appended to a log instead of rewriting the
+    whole table. The memo is only a cache: if it cannot be written, lookups
+    keep working from memory.
+    """
+
+    def __init__(self, path, version):
+        self._path = path
+        self._log = path + '.log'
+        self._log_size = 0
+        self._version = version
+        self._lock = threading.Lock()
+        self._voices = {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == version:
+                self._voices = data.get('voices', {})
+        except (OSError, ValueError, AttributeError):
+            pass
+        try:
+            with open(self._log, encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    self._replay(line)
+            self._log_size = os.path.getsize(self._log)
+        except OSError:
+            pass
+
+    def _replay(self, line):
+        try:
+            version, lang, found = json.loads(line)
+        except (ValueError, TypeError):
+            return
+        if version == self._version and isinstance(lang, str) and isinstance(found, dict):
+            self._voices.setdefault(lang, {}).update(found)
+
+    def lookup(self, lang, words):
+        with self._lock:
+            table = self._voices.get(lang, {})
+            return {w: table[w] for w in words if w in table}
+
+    def update(self, lang, found):
+        if not found or not self._version:
+            return
+        with self._lock:
+            self._voices.setdefault(lang, {}).update(found)
+            try:
+                self._persist(lang, found)
+            except OSError:
+                pass
+
+    def _persist(self, lang, found):
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        line = (json.dumps([self._version, lang, found], ensure_ascii=False)
+                + '\n').encode('utf-8')
+        if self._log_size + len(line) <= MEMO_LOG_LIMIT:
+            with open(self._log, 'ab') as f:
+                f.write(line)
+            self._log_size += len(line)
+            return
+        data = {'version': self._version, 'voices': self._voices}
+        tmp = self._path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, self._path)
+        try:
+            os.remove(self._log)
+        except FileNotFoundError:
+            pass
+        self._log_size = 0
+
+
+_memo = None
+_memo_path = None
+
+
+def _ipa_memo():
+    global _memo
+    if _memo is None:
+        path = _memo_path
+        if path is None:
+            xdg = os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))
+            path = os.path.join(xdg, 'ordbyggaren', 'ipa.json')
+        _memo = _IpaMemo(path, espeak_version())
+    return _memo
+
+
+def reset_ipa_memo(path=None):
+    """Forget the loaded IPA memo; the next lookup reads it again.
+
+    Args:
+        path: Memo file to use from now on instead of the one in the
+            user's cache directory, e.g. a temporary file in benchmarks.
+    """
+    global _memo, _memo_path
+    _memo = None
+    _memo_path = path
@@ -0,0 +1,133 @@
+"""Look-ahead preparation of the next rounds on a worker thread."""
+import threading
+from collections import deque, namedtuple
+
+from ordbyggaren import phonetics
+
+PREFETCH_ROUNDS = 1
+
+Prepared = namedtuple('Prepared', 'round difficulty review')
+
+
+class RoundPrefetcher:
+    """Keeps the next rounds of a GameSession ready.
+
+    A worker thread picks and scrambles the next word (with distractors)
+    and warms the IPA and speech caches for it, so starting the next round
+    needs no subprocess or disk I/O. Only one round is kept by default: it
+    is picked from the review state as it was before the current answer.
+    A prepared round that is thrown away gives its review word back, so
+    the snooze due_word() put on it does not hold the word back.
+
+    Args:
+        session: GameSession to prepare rounds for; its lock is held while
+            picking, so the window can keep using the session meanwhile.
+        depth: Number of rounds kept ready.
+        speech: Also render each word into the speech cache.
+    """
+
+    def __init__(self, session, depth=PREFETCH_ROUNDS, lang='sv', speech=True):
+        self.session = session
+        self.depth = max(1, depth)
+        self.lang = lang
+        self.speech = speech
+        self._ready = deque()
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._closed = False
+        self._taken = None      # word of the round take() last handed out
+        self.hits = self.misses = 0
+        self._thread = threading.Thread(target=self._run, name='round-prefetch', daemon=True)
+        self._thread.start()
+
+    def take(self):
+        """Pop the next prepared round for the current difficulty, or None.
+
+        A round for the word being played now (picked while the window
+        started a round without the prefetcher) is not handed out.
+        """
+        stale = []
+        current = self.session.current_word
+        with self._cond:
+            found = None
+            while self._ready:
+                prepared = self._ready.popleft()
+                if prepared.difficulty == self.session.difficulty \
+                        and prepared.round.word != current:
+                    found = prepared
+                    break
+                stale.append(prepared)
+            if found is not None:
+                self._taken = found.round.word
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._cond.notify()
+        self._discard(stale)
+        return found
+
+    def invalidate(self):
+        """Drop prepared rounds, e.g. after the difficulty or profile changed."""
+        with self._cond:
+            stale = list(self._ready)
+            self._ready.clear()
+            self._generation += 1
+            self._cond.notify()
+        self._discard(stale)
+
+    def _discard(self, stale):
+        with self.session.lock:
+            for prepared in stale:
+                prepared.review.release(prepared.round.word)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and len(self._ready) >= self.depth:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                generation = self._generation
+                # The taken word, not session.current_word: the window may
+                # not have started the taken round yet.
+                queued = {p.round.word for p in self._ready} | {self._taken}
+            prepared = self._prepare(queued)
+            with self._cond:
+                if prepared is None:
+                    # Nothing to play at this difficulty; wait for a change.
+                    while not self._closed and generation == self._generation:
+                        self._cond.wait()
+                elif generation == self._generation:
+                    self._ready.append(prepared)
+                    prepared = None
+            if prepared is not None:
+                self._discard([prepared])
+
+    def _prepare(self, queued, tries=4):
+        session = self.session
+        with session.lock:
+            difficulty = session.difficulty
+            review = session.review
+            # Avoid the same word twice in a row where the lexicon allows.
+            for _attempt in range(tries):
+                rnd = session.prepare_round()
+                if rnd is None or rnd.word not in queued:
+                    break
+        if rnd is None:
+            return None
+        # Warm the IPA and speech caches; the window reads them from there.
+        try:
+            phonetics.get_phonetics(rnd.word, self.lang)
+        except Exception:
+            pass
+        if self.speech:
+            try:
+                phonetics.synthesize(rnd.word, self.lang)
+            except Exception:
+                pass
+        return Prepared(rnd, difficulty, review)
@@ -0,0 +1,150 @@
+"""Recently used profiles kept ready to play, preloaded in the background."""
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ordbyggaren.learning_stats import LearningStats
+from ordbyggaren.results_store import ResultsStore
+from ordbyggaren.review import ReviewScheduler
+
+
+class ProfileState:
+    """A profile's data with the state derived from its results, and the
+    journal its new results are logged to."""
+
+    __slots__ = ('name', 'data', 'results', 'score', 'review', 'stats', 'journal')
+
+    def __init__(self, name, data, journal=None):
+        self.name = name
+        self.data = data
+        self.journal = journal
+        self.results = data['results'] = ResultsStore(data.get('results', []))
+        self.score = data.get('score', 0)
+        self.review = ReviewScheduler.from_results(self.results)
+        self.stats = LearningStats.from_results(self.results)
+
+
+def materialize(manager, name):
+    """Load a profile and build its review scheduler and statistics."""
+    return ProfileState(name, manager.load_profile(name), manager.journal(name))
+
+
+class ProfileCache:
+    """Bounded LRU of materialized profiles in front of a ProfileManager.
+
+    switch() returns a cached state at once; a miss is loaded synchronously
+    (or waits for a preload already in flight). After each switch the
+    likely next profiles - those used recently and the neighbours in the
+    profile list - are materialized on a worker thread. A cached state is
+    reloaded when another instance has logged results to the profile since.
+    """
+
+    def __init__(self, manager, capacity=4, loader=materialize):
+        self.manager = manager
+        self.capacity = max(1, capacity)
+        self._load = loader
+        self._states = OrderedDict()
+        self._pending = {}
+        self._recent = deque(maxlen=self.capacity)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='profile-preload')
+        self.hits = self.misses = 0
+
+    def get(self, name):
+        """Return the ProfileState for name, loading it if needed."""
+        with self._lock:
+            state = self._states.get(name)
+        if state is not None and not self._stale(state):
+            with self._lock:
+                self._states.move_to_end(name)
+                self.hits += 1
+            return state
+        stale = state
+        with self._lock:
+            if state is not None:
+                self._states.pop(name, None)
+            future = self._pending.get(name)
+            self.misses += 1
+        state = None
+        if future is not None:
+            try:
+                state = future.result()
+            except Exception:
+                state = None
+        if state is None:
+            state = self._load(self.manager, name)
+        if stale is not None:
+            # The session's score is not in the store.
+            state.score = stale.score
+        self._store(name, state)
+        return state
+
+    def _stale(self, state):
+        count = self.manager.result_count(state.name)
+        return count is not None and count != len(state.results)
+
+    def _store(self, name, state):
+        with self._lock:
+            self._pending.pop(name, None)
+            self._states[name] = state
+            self._states.move_to_end(name)
+            while len(self._states) > self.capacity:
+                self._states.popitem(last=False)
+
+    def switch(self, name):
+        """Make name the current profile and return its state."""
+        self.manager.switch(name)
+        state = self.get(name)
+        if name in self._recent:
+            self._recent.remove(name)
+        self._recent.append(name)
+        self.preload(self.likely_next(name))
+        return state
+
+    def likely_next(self, name):
+        """Profiles worth preloading after switching to name."""
+        candidates = [n for n in reversed(self._recent) if n != name]
+        profiles = sorted(self.manager.list_profiles())
+        if name in profiles:
+            i = profiles.index(name)
+            candidates.extend(profiles[max(0, i - 1):i] + profiles[i + 1:i + 2])
+        seen = set()
+        likely = []
+        for n in candidates:
+            if n != name and n not in seen:
+                seen.add(n)
+                likely.append(n)
+        return likely[:self.capacity - 1]
+
+    def preload(self, names):
+        """Materialize names on the worker thread unless cached already."""
+        for name in names:
+            with self._lock:
+                if name in self._states or name in self._pending:
+                    continue
+                self._pending[name] = self._pool.submit(self._preload_one, name)
+
+    def _preload_one(self, name):
+        try:
+            state = self._load(self.manager, name)
+        except Exception:
+            with self._lock:
+                self._pending.pop(name, None)
+            raise
+        self._store(name, state)
+        return state
+
+    def invalidate(self, name=None):
+        """Drop one cached profile, or all of them."""
+        with self._lock:
+            if name is None:
+                self._states.clear()
+            else:
+                self._states.pop(name, None)
+
+    def cached(self):
+        with self._lock:
+            return list(self._states)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
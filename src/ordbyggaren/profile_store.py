@@ -0,0 +1,338 @@
+"""Profile storage in one SQLite database.
+
+Profiles and their results live in ordbyggaren's config dir in
+profiles.db, opened in WAL mode so several app instances on a shared
+classroom computer can read while one writes. Results are rows indexed by
+profile, so appending one costs one INSERT and listing profiles does not
+touch the results at all.
+
+    python3 -m ordbyggaren.profile_store --migrate   # import profiles/*.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import urllib.parse
+
+SCHEMA_VERSION = 1
+# Record keys stored in their own columns; anything else goes in extra.
+RESULT_COLUMNS = ('word', 'difficulty', 'correct', 'attempts', 'date')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL DEFAULT '{}',
+    updated REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS results (
+    profile_id INTEGER NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    word TEXT,
+    difficulty TEXT,
+    correct INTEGER,
+    attempts INTEGER,
+    date TEXT,
+    extra TEXT,
+    PRIMARY KEY (profile_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_by_word ON results(profile_id, word);
+CREATE INDEX IF NOT EXISTS results_by_date ON results(profile_id, date);
+"""
+
+
+def _row(profile_id, seq, record):
+    extra = {k: v for k, v in record.items() if k not in RESULT_COLUMNS}
+    return (profile_id, seq, record.get('word'), record.get('difficulty'),
+            None if record.get('correct') is None else int(bool(record['correct'])),
+            record.get('attempts'), record.get('date'),
+            json.dumps(extra, ensure_ascii=False) if extra else None)
+
+
+def _record(row):
+    word, difficulty, correct, attempts, date, extra = row
+    record = {}
+    for key, value in (('word', word), ('difficulty', difficulty),
+                       ('correct', None if correct is None else bool(correct)),
+                       ('attempts', attempts), ('date', date)):
+        if value is not None:
+            record[key] = value
+    if extra:
+        record.update(json.loads(extra))
+    return record
+
+
+def _connect_reader(path, busy_timeout=5.0):
+    """A read-only connection; in WAL mode it reads while another writes."""
+    uri = 'file:' + urllib.parse.quote(os.path.abspath(path)) + '?mode=ro'
+    return sqlite3.connect(uri, uri=True, timeout=busy_timeout,
+                           isolation_level=None, check_same_thread=False)
+
+
+def _load(db, name):
+    """A profile's data dict with its results, read in one transaction."""
+    db.execute('BEGIN')
+    try:
+        row = db.execute('SELECT id, data FROM profiles WHERE name = ?',
+                         (name,)).fetchone()
+        if row is None:
+            return {}
+        profile_id, data = row
+        data = json.loads(data)
+        data['results'] = _results(db, profile_id)
+        return data
+    finally:
+        db.execute('COMMIT')
+
+
+def _results(db, profile_id, where='', args=()):
+    cursor = db.execute(
+        'SELECT word, difficulty, correct, attempts, date, extra FROM results '
+        f'WHERE profile_id = ?{where} ORDER BY seq', (profile_id,) + tuple(args))
+    return [_record(row) for row in cursor]
+
+
+def read_profile(path, name):
+    """Load one profile through a read-only connection of its own, e.g.
+    in a worker process. A missing database or profile is empty."""
+    if not os.path.exists(path):
+        return {}
+    db = _connect_reader(path)
+    try:
+        return _load(db, name)
+    finally:
+        db.close()
+
+
+class SqliteProfileStore:
+    """Profiles and results in one SQLite database.
+
+    A profile's data dict is stored as JSON except for its "results" list,
+    which is kept as indexed rows. Every write runs in its own IMMEDIATE
+    transaction, and other instances wait up to busy_timeout for the lock
+    instead of overwriting each other. Reads go through pooled read-only
+    connections and never take the write lock, so loading a
+    large profile in the background does not hold up an answer being
+    logged. Commits are synced to disk before they return.
+    """
+
+    def __init__(self, path, busy_timeout=5.0):
+        self.path = str(path)
+        self.busy_timeout = busy_timeout
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=busy_timeout,
+                                   isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        # FULL syncs the WAL on every commit, so a logged answer survives a
+        # power cut on the classroom computer; NORMAL could lose the last
+        # few. The fsync is cheap next to a pupil's answer rate.
+        self._db.execute('PRAGMA synchronous=FULL')
+        self._db.execute('PRAGMA foreign_keys=ON')
+        with self._lock:
+            version = self._db.execute('PRAGMA user_version').fetchone()[0]
+            if version < SCHEMA_VERSION:
+                # executescript() manages its own transaction.
+                self._db.executescript(f'BEGIN IMMEDIATE; {_SCHEMA}'
+                                       f'PRAGMA user_version={SCHEMA_VERSION}; COMMIT;')
+
+        self._readers_lock = threading.Lock()
+        self._readers = []      # idle read-only connections
+
+    def _transaction(self):
+        return _Transaction(self._db, self._lock)
+
+    @contextlib.contextmanager
+    def _reader(self):
+        """A read-only connection from the pool, for one thread at a time."""
+        with self._readers_lock:
+            db = self._readers.pop() if self._readers else None
+        if db is None:
+            db = _connect_reader(self.path, self.busy_timeout)
+        try:
+            yield db
+        finally:
+            with self._readers_lock:
+                self._readers.append(db)
+
+    def close(self):
+        with self._readers_lock:
+            for db in self._readers:
+                db.close()
+            self._readers = []
+        with self._lock:
+            self._db.close()
+
+    def list_profiles(self):
+        with self._reader() as db:
+            return [name for (name,) in
+                    db.execute('SELECT name FROM profiles ORDER BY name')]
+
+    def _profile_id(self, db, name, create=False):
+        row = db.execute('SELECT id FROM profiles WHERE name = ?', (name,)).fetchone()
+        if row is not None:
+            return row[0]
+        if not create:
+            return None
+        return db.execute('INSERT INTO profiles (name, updated) VALUES (?, ?)',
+                          (name, time.time())).lastrowid
+
+    def load(self, name):
+        """Return the profile's data dict with its results, or {}."""
+        with self._reader() as db:
+            return _load(db, name)
+
+    def results(self, name, word=None, since=None):
+        """Return a profile's results, optionally for one word or from a date."""
+        where, args = '', []
+        if word is not None:
+            where += ' AND word = ?'
+            args.append(word)
+        if since is not None:
+            where += ' AND date >= ?'
+            args.append(since)
+        with self._reader() as db:
+            db.execute('BEGIN')
+            try:
+                profile_id = self._profile_id(db, name)
+                return [] if profile_id is None else _results(db, profile_id, where, args)
+            finally:
+                db.execute('COMMIT')
+
+    def count(self, name):
+        with self._reader() as db:
+            row = db.execute(
+                'SELECT COUNT(*) FROM results JOIN profiles ON profiles.id = profile_id '
+                'WHERE name = ?', (name,)).fetchone()
+        return row[0]
+
+    def save(self, name, data):
+        """Store a profile's data dict.
+
+        Results are treated as append-only: rows already stored are kept
+        and only new ones are inserted, unless the stored history no
+        longer matches, in which case it is replaced.
+        """
+        data = dict(data)
+        results = data.pop('results', None)
+        with self._transaction() as db:
+            profile_id = self._profile_id(db, name, create=True)
+            db.execute('UPDATE profiles SET data = ?, updated = ? WHERE id = ?',
+                       (json.dumps(data, ensure_ascii=False), time.time(), profile_id))
+            if results is None:
+                return
+            stored = db.execute('SELECT COUNT(*) FROM results WHERE profile_id = ?',
+                                (profile_id,)).fetchone()[0]
+            if stored and not (stored <= len(results)
+                               and self._last_matches(db, profile_id, stored, results)):
+                db.execute('DELETE FROM results WHERE profile_id = ?', (profile_id,))
+                stored = 0
+            db.executemany('INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                           (_row(profile_id, seq, r)
+                            for seq, r in enumerate(results[stored:], stored)))
+
+    def _last_matches(self, db, profile_id, stored, results):
+        row = db.execute('SELECT word, difficulty, correct, attempts, date, extra '
+                         'FROM results WHERE profile_id = ? AND seq = ?',
+                         (profile_id, stored - 1)).fetchone()
+        return row is not None and _record(row) == _record(_row(0, 0, results[stored - 1])[2:])
+
+    def append_result(self, name, record):
+        """Add one result to a profile in a single transaction."""
+        self.append_results(name, [record])
+
+    def append_results(self, name, records):
+        """Add results after a profile's existing ones in one transaction."""
+        with self._transaction() as db:
+            profile_id = self._profile_id(db, name, create=True)
+            seq = db.execute('SELECT COALESCE(MAX(seq) + 1, 0) FROM results '
+                             'WHERE profile_id = ?', (profile_id,)).fetchone()[0]
+            db.executemany('INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                           (_row(profile_id, i, r) for i, r in enumerate(records, seq)))
+            db.execute('UPDATE profiles SET updated = ? WHERE id = ?',
+                       (time.time(), profile_id))
+
+    def delete(self, name):
+        with self._transaction() as db:
+            db.execute('DELETE FROM profiles WHERE name = ?', (name,))
+
+    def migrate_json(self, directory):
+        """Import profiles/*.json files not yet in the database.
+
+        Each imported file is renamed to *.json.migrated. Returns the
+        names imported; unreadable files are left alone.
+        """
+        imported = []
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            return imported
+        existing = set(self.list_profiles())
+        for filename in names:
+            if not filename.endswith('.json'):
+                continue
+            name = filename[:-5]
+            path = os.path.join(directory, filename)
+            if name in existing:
+                continue
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not isinstance(data, dict):
+                continue
+            self.save(name, data)
+            imported.append(name)
+            try:
+                os.replace(path, path + '.migrated')
+            except OSError:
+                pass
+        return imported
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT under the store's thread lock."""
+
+    def __init__(self, db, lock):
+        self._db = db
+        self._lock = lock
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self._db.execute('BEGIN IMMEDIATE')
+        except Exception:
+            self._lock.release()
+            raise
+        return self._db
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._db.execute('ROLLBACK' if exc_type else 'COMMIT')
+        finally:
+            self._lock.release()
+        return False
+
+
+def main(argv=None):
+    from ordbyggaren.profiles import ProfileManager
+    parser = argparse.ArgumentParser(
+        prog='python3 -m ordbyggaren.profile_store',
+        description='Inspect the SQLite profile store.')
+    parser.add_argument('--migrate', action='store_true',
+                        help='import profiles/*.json into the database')
+    args = parser.parse_args(argv)
+
+    manager = ProfileManager('ordbyggaren', backend='sqlite', migrate=args.migrate)
+    for name in manager.list_profiles():
+        print(f'{name}\t{manager.store.count(name)}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,16 +1,42 @@
-
 # --- User profiles ---
 import json as _pjson
 import os as _pos2
 
+from ordbyggaren.results_store import ResultsStore
+
+BACKENDS = ('json', 'sqlite')
+
+
 class ProfileManager:
-    """Simple user profile management for barn-appar."""
+    """Simple user profile management for barn-appar.
 
-    def __init__(self, app_name):
+    The default backend keeps every profile in a shared profiles.db (see
+    profile_store), which several instances can write to at once, and with
+    migrate=True imports existing profiles/*.json files into it.
+    backend='json' keeps one JSON file per profile instead. config_dir
+    replaces ~/.config/<app_name>, e.g. for benchmarks.
+    """
+
+    def __init__(self, app_name, backend='sqlite', migrate=True, config_dir=None):
+        if backend not in BACKENDS:
+            raise ValueError(f'unknown profile backend {backend!r}')
         self._app_name = app_name
-        self._dir = _pos2.path.join(_pos2.path.expanduser('~'), '.config', app_name, 'profiles')
+        if config_dir is None:
+            config_dir = _pos2.path.join(_pos2.path.expanduser('~'), '.config', app_name)
+        self._dir = _pos2.path.join(config_dir, 'profiles')
         _pos2.makedirs(self._dir, exist_ok=True)
         self._current = self._load_current()
+        self.backend = backend
+        self.store = None
+        if backend == 'sqlite':
+            from ordbyggaren.profile_store import SqliteProfileStore
+            self.store = SqliteProfileStore(self.db_path)
+            if migrate:
+                self.store.migrate_json(self._dir)
+
+    @property
+    def db_path(self):
+        return _pos2.path.join(_pos2.path.dirname(self._dir), 'profiles.db')
 
     def _load_current(self):
         try:
@@ -29,19 +55,114 @@ class ProfileManager:
             f.write(name)
 
     def list_profiles(self):
+        if self.store is not None:
+            return sorted(set(['default'] + self.store.list_profiles()))
         profiles = ['default']
         for f in sorted(_pos2.listdir(self._dir)):
             if f.endswith('.json') and f != '.current':
                 profiles.append(f[:-5])
         return list(set(profiles))
 
+    def profile_path(self, name):
+        return _pos2.path.join(self._dir, f'{name}.json')
+
+    def profile_source(self, name):
+        """Picklable description of where a profile is stored, for read_profile()."""
+        if self.store is not None:
+            return ('sqlite', self.db_path, name)
+        return ('json', self.profile_path(name))
+
     def save_data(self, data):
-        with open(_pos2.path.join(self._dir, f'{self._current}.json'), 'w') as f:
+        if self.store is not None:
+            self.store.save(self._current, data)
+            return
+        if not isinstance(data.get('results', []), list):
+            data = dict(data, results=list(data['results']))
+        with open(self.profile_path(self._current), 'w') as f:
+            _pjson.dump(data, f, ensure_ascii=False, indent=2)
+
+    def append_result(self, record, name=None):
+        """Add one result to a profile (default: the current one)."""
+        self.append_results([record], name)
+
+    def append_results(self, records, name=None):
+        name = self._current if name is None else name
+        if self.store is not None:
+            self.store.append_results(name, records)
+            return
+        data = self.load_profile(name)
+        data['results'] = list(data.get('results', [])) + list(records)
+        with open(self.profile_path(name), 'w') as f:
             _pjson.dump(data, f, ensure_ascii=False, indent=2)
 
+    def result_count(self, name):
+        """Number of stored results, or None where counting is not cheap."""
+        return self.store.count(name) if self.store is not None else None
+
+    def journal(self, name=None):
+        """Return a ProfileJournal for a profile (default: the current one)."""
+        return ProfileJournal(self, self._current if name is None else name)
+
+    def import_journal(self, journal, name=None):
+        """Move the results of a ResultsJournal into a profile, once.
+
+        This is how the history logged before profiles existed (one
+        results.jsonl for everyone) ends up in the current profile. The
+        journal file is renamed first, so of several instances starting at
+        once only one imports it. Returns the number of results moved.
+        """
+        from ordbyggaren.journal import ResultsJournal
+        migrated = journal.path + '.migrated'
+        try:
+            if not _pos2.path.exists(journal.path):
+                journal.load()          # imports legacy results.json, if any
+            _pos2.replace(journal.path, migrated)
+        except OSError:
+            return 0
+        records = list(ResultsJournal(migrated).load())
+        if records:
+            self.append_results(records, name)
+        return len(records)
+
     def load_data(self):
+        return self.load_profile(self._current)
+
+    def load_profile(self, name):
+        if self.store is not None:
+            return self.store.load(name)
         try:
-            with open(_pos2.path.join(self._dir, f'{self._current}.json')) as f:
+            with open(self.profile_path(name)) as f:
                 return _pjson.load(f)
         except (FileNotFoundError, _pjson.JSONDecodeError):
             return {}
+
+
+class ProfileJournal:
+    """A profile's results, with the journal interface GameSession logs to."""
+
+    def __init__(self, manager, name):
+        self.manager = manager
+        self.name = name
+
+    def append(self, record):
+        self.manager.append_result(record, self.name)
+
+    def load(self):
+        """Return the profile's results as a ResultsStore."""
+        results = self.manager.load_profile(self.name).get('results', [])
+        return ResultsStore(r for r in results if isinstance(r, dict))
+
+
+def read_profile(source):
+    """Load a profile from a profile_source() tuple, e.g. in another process.
+
+    A missing profile is empty; unreadable data raises.
+    """
+    if source[0] == 'sqlite':
+        from ordbyggaren.profile_store import read_profile as read_stored
+        return read_stored(source[1], source[2])
+    try:
+        with open(source[1], encoding='utf-8') as f:
+            return _pjson.load(f)
+    except FileNotFoundError:
+        return {}
@@ -0,0 +1,241 @@
+"""Compact, column-oriented results history.
+
+A result normally is a dict such as
+
+    {"word": "sol", "difficulty": "Easy", "correct": true,
+     "attempts": 3, "date": "2026-01-05 10:42", "answer": "sol"}
+
+ResultsStore keeps the same information in typed arrays: interned word
+and difficulty ids, the date as minutes since 1970 (the date format has
+minute resolution), a correct flag, the attempt counter and the interned
+answer the learner built. That is under 20 bytes per result instead of
+several hundred, while iteration, len() and indexing still give the
+familiar dicts.
+"""
+import time
+from array import array
+from datetime import datetime, timedelta
+
+from ordbyggaren.review import DATE_FORMAT
+
+FIELDS = ('word', 'difficulty', 'correct', 'attempts', 'date', 'answer')
+_EPOCH = datetime(1970, 1, 1)
+_MISSING = -1
+
+
+def date_to_minutes(date):
+    """Minutes since 1970 for a DATE_FORMAT string, or -1."""
+    try:
+        return int((datetime.strptime(date, DATE_FORMAT) - _EPOCH).total_seconds()) // 60
+    except (TypeError, ValueError):
+        return _MISSING
+
+
+class _Interner:
+    """Maps strings to small ints and back."""
+
+    def __init__(self):
+        self.values = []
+        self._ids = {}
+
+    def id(self, value):
+        i = self._ids.get(value)
+        if i is None:
+            i = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+
+class ResultsStore:
+    """List-like results history stored as columns.
+
+    append(), len(), iteration and indexing work with result dicts, so
+    the store can stand in for the list used so far. Records that carry
+    other keys or unusual values keep those in a small side table and
+    come back unchanged.
+    """
+
+    def __init__(self, records=()):
+        self._words = _Interner()
+        self._difficulties = _Interner()
+        self._answers = _Interner()
+        self.word_ids = array('I')
+        self.difficulty_ids = array('H')
+        self.minutes = array('i')
+        self.correct = array('b')
+        self.attempts = array('i')
+        self.answer_ids = array('i')
+        self._extra = {}
+        self._date_cache = {}
+        self._day_cache = {}
+        self.extend(records)
+
+    def __len__(self):
+        return len(self.word_ids)
+
+    def append(self, record):
+        i = len(self.word_ids)
+        word = record.get('word', '')
+        difficulty = record.get('difficulty', '')
+        correct = record.get('correct')
+        attempts = record.get('attempts')
+        date = record.get('date')
+        answer = record.get('answer')
+        minutes = self._minutes(date) if date is not None else _MISSING
+        # Anything that would not come back identical goes to the side table.
+        regular = (isinstance(word, str) and isinstance(difficulty, str)
+                   and (correct is None or isinstance(correct, bool))
+                   and (attempts is None or (type(attempts) is int and 0 <= attempts < 2 ** 31))
+                   and (date is None or minutes != _MISSING)
+                   and (answer is None or isinstance(answer, str))
+                   and list(record) == [k for k in FIELDS if k in record]
+                   and 'word' in record and 'difficulty' in record)
+        self.word_ids.append(self._words.id(word))
+        self.difficulty_ids.append(self._difficulties.id(difficulty))
+        self.minutes.append(minutes)
+        self.correct.append(_MISSING if correct is None else int(bool(correct)))
+        self.attempts.append(attempts if isinstance(attempts, int)
+                             and 0 <= attempts < 2 ** 31 else _MISSING)
+        self.answer_ids.append(self._answers.id(answer) if isinstance(answer, str) else _MISSING)
+        if not regular:
+            self._extra[i] = dict(record)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def _minutes(self, date):
+        # Parses canonical "YYYY-MM-DD HH:MM" only, with the day looked up
+        # in a cache; anything else is -1 and kept verbatim.
+        if not isinstance(date, str) or len(date) != 16 or date[10] != ' ' \
+                or date[13] != ':':
+            return _MISSING
+        day = self._day_cache.get(date[:10])
+        if day is None:
+            minutes = date_to_minutes(date[:10] + ' 00:00')
+            if minutes == _MISSING or self._date(minutes)[:10] != date[:10]:
+                return _MISSING
+            day = self._day_cache[date[:10]] = minutes // 1440
+        hh, mm = date[11:13], date[14:16]
+        if not (hh.isdigit() and mm.isdigit() and int(hh) < 24 and int(mm) < 60):
+            return _MISSING
+        return day * 1440 + int(hh) * 60 + int(mm)
+
+    def _date(self, minutes):
+        # Dates repeat a lot (sessions), so formatting is cached per day.
+        day, minute = divmod(minutes, 1440)
+        prefix = self._date_cache.get(day)
+        if prefix is None:
+            prefix = self._date_cache[day] = (_EPOCH + timedelta(days=day)).strftime('%Y-%m-%d')
+        return f'{prefix} {minute // 60:02d}:{minute % 60:02d}'
+
+    def record(self, i):
+        """Return result i as a dict."""
+        extra = self._extra.get(i)
+        if extra is not None:
+            return dict(extra)
+        record = {'word': self._words.values[self.word_ids[i]],
+                  'difficulty': self._difficulties.values[self.difficulty_ids[i]]}
+        if self.correct[i] != _MISSING:
+            record['correct'] = bool(self.correct[i])
+        if self.attempts[i] != _MISSING:
+            record['attempts'] = self.attempts[i]
+        if self.minutes[i] != _MISSING:
+            record['date'] = self._date(self.minutes[i])
+        if self.answer_ids[i] != _MISSING:
+            record['answer'] = self._answers.values[self.answer_ids[i]]
+        return record
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.record(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('result index out of range')
+        return self.record(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.record(i)
+
+    def rows(self):
+        """Yield (word, difficulty, correct, attempts, date) tuples.
+
+        Missing values are None. This skips building dicts, for exporters.
+        """
+        words, difficulties = self._words.values, self._difficulties.values
+        flags = {_MISSING: None, 0: False, 1: True}
+        extra = self._extra
+        # Formatted dates are shared for the duration of one pass.
+        dates = {_MISSING: None}
+        for i, (w, d, c, a, m) in enumerate(zip(self.word_ids, self.difficulty_ids,
+                                                 self.correct, self.attempts, self.minutes)):
+            if extra and i in extra:
+                r = extra[i]
+                yield (r.get('word', ''), r.get('difficulty', ''), r.get('correct'),
+                       r.get('attempts'), r.get('date'))
+                continue
+            date = dates.get(m)
+            if date is None and m != _MISSING:
+                date = dates[m] = self._date(m)
+            yield (words[w], difficulties[d], flags[c],
+                   None if a == _MISSING else a, date)
+
+    def timestamps(self):
+        """Yield each result's date as local epoch seconds (now if missing)."""
+        offsets = {}
+        now = time.time()
+        for m in self.minutes:
+            if m == _MISSING:
+                yield now
+                continue
+            hour = m - m % 60
+            offset = offsets.get(hour)
+            if offset is None:
+                local = (_EPOCH + timedelta(minutes=hour)).timestamp()
+                offset = offsets[hour] = hour * 60 - local
+            yield m * 60 - offset
+
+    @property
+    def words(self):
+        """Word for each id in word_ids."""
+        return self._words.values
+
+    @property
+    def difficulties(self):
+        """Difficulty label for each id in difficulty_ids."""
+        return self._difficulties.values
+
+    @property
+    def answers(self):
+        """Answer text for each id in answer_ids (-1 means none)."""
+        return self._answers.values
+
+    def word_id(self, word):
+        return self._words._ids.get(word)
+
+    def columns(self):
+        """Copies of the typed columns, as NumPy arrays when NumPy is
+        installed.
+
+        The copies are taken at one length, so they line up even while
+        results are appended, and holding them never blocks append().
+        """
+        n = len(self)
+        cols = {'word_id': self.word_ids[:n], 'difficulty_id': self.difficulty_ids[:n],
+                'minutes': self.minutes[:n], 'correct': self.correct[:n],
+                'attempts': self.attempts[:n], 'answer_id': self.answer_ids[:n]}
+        try:
+            import numpy as np
+        except ImportError:
+            return cols
+        # Views of the private copies, which are never resized.
+        return {name: np.frombuffer(col, dtype=col.typecode) if len(col)
+                else np.array([], dtype=col.typecode) for name, col in cols.items()}
+
+    def nbytes(self):
+        """Approximate memory used by the columns."""
+        return sum(col.itemsize * len(col) for col in
+                   (self.word_ids, self.difficulty_ids, self.minutes,
+                    self.correct, self.attempts, self.answer_ids))
@@ -0,0 +1,170 @@
+"""Spaced-repetition word scheduling driven by the results history."""
+import heapq
+import itertools
+import time
+from datetime import datetime
+
+# Seconds until a word is due again, by number of correct answers in a row.
+INTERVALS = (60, 10 * 60, 60 * 60, 24 * 3600, 3 * 24 * 3600, 7 * 24 * 3600,
+             21 * 24 * 3600)
+# A word that was always answered wrong is brought forward by this share
+# of its current interval; a word never missed is not brought forward.
+ERROR_WEIGHT = 0.5
+# How long a word that was shown but not answered is held back.
+SNOOZE = 60
+
+DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+
+class WordState:
+    """Review state of one word."""
+
+    __slots__ = ('word', 'difficulty', 'seen', 'errors', 'streak', 'due', 'held',
+                 'version')
+
+    def __init__(self, word, difficulty):
+        self.word = word
+        self.difficulty = difficulty
+        self.seen = 0
+        self.errors = 0
+        self.streak = 0
+        self.due = 0.0
+        self.held = 0.0
+        self.version = 0
+
+    @property
+    def error_rate(self):
+        return self.errors / self.seen if self.seen else 0.0
+
+    @property
+    def interval(self):
+        return INTERVALS[min(self.streak, len(INTERVALS) - 1)]
+
+    @property
+    def priority(self):
+        """When the word is next due, brought forward within its interval
+        by its error rate, but never before a snooze ends."""
+        return max(self.due - self.error_rate * ERROR_WEIGHT * self.interval, self.held)
+
+
+class ReviewScheduler:
+    """Heap of seen words per difficulty, ordered by due time and error rate.
+
+    Each result pushes one new heap entry (O(log n)); superseded entries are
+    skipped lazily when they reach the top. Picking the next word is
+    O(log n) amortized no matter how large the lexicon or history is.
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._heaps = {}
+        self._seq = itertools.count()
+
+    @classmethod
+    def from_results(cls, results):
+        """Replay a results history once to build the initial queue."""
+        scheduler = cls()
+        if hasattr(results, 'timestamps'):
+            # ResultsStore: dates are already parsed.
+            answers = results.answers
+            for (word, difficulty, correct, _attempts, _date), when, answer_id in \
+                    zip(results.rows(), results.timestamps(), results.answer_ids):
+                answer = answers[answer_id] if answer_id >= 0 else None
+                if reviewed(word, correct, answer):
+                    scheduler.record(word, difficulty, bool(correct), when)
+            return scheduler
+        for r in results:
+            if reviewed(r.get("word", ""), r.get("correct", False), r.get("answer")):
+                scheduler.record(r.get("word", ""), r.get("difficulty", ""),
+                                 r.get("correct", False), _timestamp(r.get("date")))
+        return scheduler
+
+    def __len__(self):
+        return len(self._states)
+
+    def state(self, word):
+        return self._states.get(word)
+
+    def record(self, word, difficulty, correct, when=None):
+        """Update a word after an answer and requeue it."""
+        if not word:
+            return
+        when = time.time() if when is None else when
+        state = self._states.get(word)
+        if state is None:
+            state = self._states[word] = WordState(word, difficulty)
+        state.difficulty = difficulty
+        state.seen += 1
+        if correct:
+            state.streak += 1
+        else:
+            state.errors += 1
+            state.streak = 0
+        state.due = when + state.interval
+        self._push(state)
+
+    def _push(self, state):
+        state.version += 1
+        heapq.heappush(self._heaps.setdefault(state.difficulty, []),
+                       (state.priority, next(self._seq), state.word, state.version))
+
+    def _top(self, difficulty):
+        heap = self._heaps.get(difficulty)
+        while heap:
+            _priority, _seq, word, version = heap[0]
+            state = self._states.get(word)
+            if state is not None and state.version == version \
+                    and state.difficulty == difficulty:
+                return state
+            heapq.heappop(heap)
+        return None
+
+    def due_word(self, difficulty, now=None):
+        """Return the most urgent word that is due for review, or None.
+
+        The word is snoozed briefly so skipping it does not bring the same
+        word straight back; answering it reschedules it normally.
+        """
+        now = time.time() if now is None else now
+        state = self._top(difficulty)
+        if state is None or state.priority > now:
+            return None
+        state.held = now + SNOOZE
+        self._push(state)
+        return state.word
+
+    def release(self, word):
+        """Undo the snooze of a word due_word() returned but nobody played."""
+        state = self._states.get(word)
+        if state is not None and state.held:
+            state.held = 0.0
+            self._push(state)
+
+    def next_word(self, difficulty, pick_new, now=None, tries=4):
+        """Return a due word, or else a word from pick_new() that has not
+        been seen yet (the last candidate if every try was seen)."""
+        word = self.due_word(difficulty, now)
+        if word is not None:
+            return word
+        candidate = None
+        for _attempt in range(tries):
+            candidate = pick_new()
+            if candidate is None or candidate not in self._states:
+                break
+        return candidate
+
+
+def reviewed(word, correct, answer=None):
+    """Whether a result moves the word's review state.
+
+    A correct result whose answer is another real word says nothing about
+    the word that was asked for, so it is left out.
+    """
+    return not (correct and answer and answer != word)
+
+
+def _timestamp(date):
+    try:
+        return datetime.strptime(date, DATE_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
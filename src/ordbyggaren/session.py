@@ -0,0 +1,306 @@
+"""Game session logic, independent of the GTK window.
+
+The window drives a GameSession; the same engine can be run headless by
+simulate() to profile word selection, scrambling and logging:
+
+    python3 -m ordbyggaren.session --rounds 1000000 --seed 1
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+from ordbyggaren import lexicon as lexicon_mod
+from ordbyggaren.distractors import DistractorEngine
+from ordbyggaren.learning_stats import LearningStats
+from ordbyggaren.review import DATE_FORMAT, ReviewScheduler, reviewed
+
+DISTRACTOR_COUNT = 3
+
+# chunks: the word as answer tiles (letters, or sound chunks such as
+# 'STJ'); letters: those tiles plus distractors, shuffled.
+Round = namedtuple('Round', 'word emoji letters chunks')
+
+
+class GameSession:
+    """Word choice, scrambling, checking, scoring and result logging.
+
+    Args:
+        lexicon: Lexicon or MemoryLexicon to draw words from.
+        levels: Difficulty labels, in lexicon difficulty order.
+        results: Result history (list-like); new results are appended.
+        journal: Optional object with append(record) for persistence.
+        rng: random.Random used for every random choice.
+        clock: Function returning the current time as epoch seconds.
+        review: ReviewScheduler already built from results, if any.
+        stats: LearningStats already built from results, if any.
+        distractors: DistractorEngine; by default one weighted by stats.
+        chunker: Function splitting a word into answer tiles, such as
+            AlignmentIndex.graphemes for sound chunks; None for letters.
+        validator: Word set (e.g. dawg.Dawg) of which any word built from
+            the tiles is accepted, not only the round's word.
+    """
+
+    def __init__(self, lexicon, levels, results=None, journal=None,
+                 rng=None, clock=time.time, review=None, stats=None,
+                 distractors=None, chunker=None, validator=None):
+        self.lexicon = lexicon
+        self.levels = list(levels)
+        self.difficulty = self.levels[0]
+        self.results = [] if results is None else results
+        self.journal = journal
+        # The ProfileState being played, if any; its score is kept up to date.
+        self.profile = None
+        self.rng = rng or random.Random()
+        self.clock = clock
+        self.review = ReviewScheduler.from_results(self.results) if review is None else review
+        self.stats = LearningStats.from_results(self.results) if stats is None else stats
+        self.distractors = distractors or DistractorEngine(stats=self.stats)
+        self.chunker = chunker
+        self.validator = validator
+        # The other real word the last correct answer spelled, if any.
+        self.alternative = None
+        self.score = 0
+        self.attempts = 0
+        self.round = None
+        self.typed_letters = []
+        # Held while picking words or logging results, so a prefetcher
+        # can prepare rounds on another thread.
+        self.lock = threading.RLock()
+
+    @property
+    def current_word(self):
+        return self.round.word if self.round else ""
+
+    @property
+    def current_emoji(self):
+        return self.round.emoji if self.round else ""
+
+    @property
+    def letters(self):
+        return self.round.letters if self.round else []
+
+    @property
+    def answer_length(self):
+        """Number of tiles in a complete answer."""
+        return len(self.round.chunks) if self.round else 0
+
+    def use_profile(self, state):
+        """Continue with a profile's ProfileState (see profile_cache); new
+        results are logged to the profile's journal. The score so far is
+        left in the outgoing profile's state."""
+        with self.lock:
+            if self.profile is not None:
+                self.profile.score = self.score
+            self.profile = state
+            self.results = state.results
+            self.journal = state.journal
+            self.review = state.review
+            self.stats = state.stats
+            self.distractors.stats = state.stats
+            self.score = state.score
+            self.attempts = 0
+            self.round = None
+            self.typed_letters = []
+
+    def set_difficulty(self, difficulty):
+        self.difficulty = difficulty
+
+    def pick_entry(self):
+        """Choose the next lexicon entry: a due review word, else a new one."""
+        with self.lock:
+            level = self.levels.index(self.difficulty)
+            word = self.review.next_word(self.difficulty,
+                                         lambda: self._random_word(level),
+                                         now=self.clock())
+            entry = self.lexicon.find(word) if word else None
+            if entry is None:
+                entry = self.lexicon.random(rng=self.rng, difficulty=level)
+            return entry
+
+    def _random_word(self, level):
+        entry = self.lexicon.random(rng=self.rng, difficulty=level)
+        return entry.word if entry else None
+
+    def tiles(self, word):
+        """Split a word into its answer tiles."""
+        if self.chunker is not None:
+            return list(self.chunker(word))
+        return list(word.upper())
+
+    def scramble(self, word, chunks=None):
+        """Return the word's tiles plus distractors, shuffled."""
+        with self.lock:
+            letters = list(chunks) if chunks is not None else self.tiles(word)
+            letters.extend(self.distractors.pick(word, DISTRACTOR_COUNT, self.rng))
+            self.rng.shuffle(letters)
+            return letters
+
+    def make_round(self, entry):
+        """Build a Round for entry without starting it."""
+        chunks = tuple(self.tiles(entry.word))
+        return Round(entry.word, entry.emoji, self.scramble(entry.word, chunks), chunks)
+
+    def prepare_round(self):
+        """Pick and scramble the next word. Returns a Round or None."""
+        entry = self.pick_entry()
+        return self.make_round(entry) if entry is not None else None
+
+    def begin(self, rnd):
+        """Make a prepared Round the current one."""
+        self.round = rnd
+        self.typed_letters = []
+        return rnd
+
+    def start_round(self, entry):
+        return self.begin(self.make_round(entry))
+
+    def new_word(self):
+        """Start a round with the next word. Returns the Round or None."""
+        rnd = self.prepare_round()
+        return self.begin(rnd) if rnd is not None else None
+
+    def add_letter(self, letter):
+        """Place a tile in the answer. Returns False if the answer is full."""
+        if len(self.typed_letters) >= self.answer_length:
+            return False
+        self.typed_letters.append(letter)
+        return True
+
+    def clear(self):
+        self.typed_letters = []
+
+    def is_complete(self):
+        return bool(self.round) and len(self.typed_letters) == self.answer_length
+
+    def check(self):
+        """Score a complete answer and log it.
+
+        Returns True or False for a complete answer, None otherwise.
+        """
+        if not self.is_complete():
+            return None
+        attempt = "".join(self.typed_letters).lower()
+        self.attempts += 1
+        correct = attempt == self.current_word
+        self.alternative = None
+        if not correct and self.validator is not None and attempt in self.validator:
+            correct = True
+            self.alternative = attempt
+        if correct:
+            self.score += 1
+        self.log_result(self.current_word, correct, attempt)
+        return correct
+
+    def log_result(self, word, correct, answer=None):
+        now = self.clock()
+        record = {
+            "word": word,
+            "difficulty": self.difficulty,
+            "correct": correct,
+            "attempts": self.attempts,
+            "date": datetime.fromtimestamp(now).strftime(DATE_FORMAT),
+        }
+        if answer is not None:
+            record["answer"] = answer
+        with self.lock:
+            self.results.append(record)
+            if reviewed(word, correct, answer):
+                self.review.record(word, self.difficulty, correct, now)
+            self.stats.add(record)
+            journal = self.journal
+        if journal is not None:
+            journal.append(record)
+        return record
+
+
+def simulate(rounds, seed=0, lexicon=None, levels=None, error_rate=0.2,
+             journal=None, keep_results=1000):
+    """Play synthetic rounds headless and return throughput figures.
+
+    A simulated clock advances 20 s per round so the review scheduler sees
+    realistic due times. Only the last keep_results results stay in memory.
+    """
+    if levels is None:
+        from ordbyggaren.words import WORDS
+        levels = list(WORDS)
+    if lexicon is None:
+        lexicon = lexicon_mod.load_default()
+    rng = random.Random(seed)
+    sim_time = [datetime(2026, 1, 1).timestamp()]
+    session = GameSession(lexicon, levels, results=deque(maxlen=keep_results),
+                          journal=journal, rng=rng, clock=lambda: sim_time[0])
+
+    select = scramble = log = 0.0
+    correct_count = 0
+    perf = time.perf_counter
+    start = perf()
+    for i in range(rounds):
+        sim_time[0] += 20
+        if i % 50 == 0:
+            session.set_difficulty(rng.choice(levels))
+        t0 = perf()
+        entry = session.pick_entry()
+        t1 = perf()
+        if entry is None:
+            continue
+        session.start_round(entry)
+        t2 = perf()
+        answer = list(entry.word.upper())
+        if rng.random() < error_rate:
+            rng.shuffle(answer)
+        for letter in answer:
+            session.add_letter(letter)
+        t3 = perf()
+        if session.check():
+            correct_count += 1
+        t4 = perf()
+        select += t1 - t0
+        scramble += t2 - t1
+        log += t4 - t3
+    elapsed = perf() - start
+
+    def per_round(total):
+        return round(total / rounds * 1e6, 2) if rounds else 0.0
+
+    return {
+        "rounds": rounds,
+        "seed": seed,
+        "seconds": round(elapsed, 3),
+        "rounds_per_second": round(rounds / elapsed) if elapsed else 0,
+        "select_us": per_round(select),
+        "scramble_us": per_round(scramble),
+        "check_and_log_us": per_round(log),
+        "correct": correct_count,
+        "words_reviewed": len(session.review),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m ordbyggaren.session',
+        description='Run the game engine headless on synthetic rounds.')
+    parser.add_argument('--rounds', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.2)
+    parser.add_argument('--lexicon', help='compiled lexicon file (default: installed or built-in)')
+    parser.add_argument('--journal', help='also append results to this JSONL journal')
+    args = parser.parse_args(argv)
+
+    lex = lexicon_mod.Lexicon(args.lexicon) if args.lexicon else None
+    journal = None
+    if args.journal:
+        from ordbyggaren.journal import ResultsJournal
+        journal = ResultsJournal(args.journal)
+    stats = simulate(args.rounds, seed=args.seed, lexicon=lex,
+                     error_rate=args.error_rate, journal=journal)
+    for key, value in stats.items():
+        print(f'{key}: {value}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
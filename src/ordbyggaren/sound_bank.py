@@ -0,0 +1,304 @@
+"""Letter-sound clips held in memory for instant playback.
+
+Each tile sound is a short clip: a recording from a sounds/ data directory
+if one is installed (e.g. ~/.local/share/ordbyggaren/sounds/s.wav), else
+espeak-ng's rendering of the phoneme, made once and kept in the speech
+cache. At startup every clip is decoded, trimmed of silence and converted
+to one sample rate, so playing a tile is a write of PCM bytes to a raw
+audio player that stays open, and a whole word is its clips joined.
+Keys are tile labels: single letters and the sound chunks of alignment.
+"""
+import os
+import subprocess
+import threading
+import time
+import wave
+from array import array
+
+from ordbyggaren import phonetics, speech_cache, speech_worker
+
+RATE = 22050
+# Samples quieter than this are trimmed from both ends of a clip.
+SILENCE = 400
+# Pause between sounds when a word is sounded out.
+GAP_MS = 60
+# Player buffer; small so a click is heard at once.
+LATENCY_MS = 30
+# Clips are written in slices of SLICE_MS, never more than LEAD_MS ahead
+# of playback, so a new tap only waits for LEAD_MS + LATENCY_MS of audio.
+SLICE_MS = 10
+LEAD_MS = 15
+
+# espeak-ng phoneme input for each tile sound. Swedish long o is [uː], so
+# O maps to u: and Å to o:. Stops get a short schwa to be audible alone.
+SOUNDS = {
+    'A': '[[A:]]', 'E': '[[e:]]', 'I': '[[i:]]', 'O': '[[u:]]', 'U': '[[}:]]',
+    'Y': '[[y:]]', 'Å': '[[o:]]', 'Ä': '[[E:]]', 'Ö': '[[2:]]',
+    'B': '[[b@]]', 'C': '[[s:]]', 'D': '[[d@]]', 'F': '[[f:]]', 'G': '[[g@]]',
+    'H': '[[h@]]', 'J': '[[j:]]', 'K': '[[k@]]', 'L': '[[l:]]', 'M': '[[m:]]',
+    'N': '[[n:]]', 'P': '[[p@]]', 'Q': '[[k@]]', 'R': '[[r:]]', 'S': '[[s:]]',
+    'T': '[[t@]]', 'V': '[[v:]]', 'W': '[[v:]]', 'X': '[[ks]]', 'Z': '[[s:]]',
+    # Sound chunks (see alignment.GRAPHEMES). The sj-sound is approximated
+    # by [ʃ] and the tj-sound by [ç].
+    'SJ': '[[S:]]', 'SKJ': '[[S:]]', 'STJ': '[[S:]]', 'SCH': '[[S:]]', 'SK': '[[S:]]',
+    'CH': '[[S:]]', 'TJ': '[[C:]]', 'KJ': '[[C:]]', 'GJ': '[[j:]]', 'DJ': '[[j:]]',
+    'LJ': '[[j:]]', 'HJ': '[[j:]]', 'NG': '[[N:]]', 'CK': '[[k@]]',
+}
+
+
+def sound_dirs():
+    """Directories searched for recorded clips named <sound>.wav."""
+    data_home = os.environ.get('XDG_DATA_HOME', os.path.expanduser('~/.local/share'))
+    data_dirs = os.environ.get('XDG_DATA_DIRS', '/usr/local/share:/usr/share')
+    return [os.path.join(d, 'ordbyggaren', 'sounds')
+            for d in [data_home] + data_dirs.split(':') if d]
+
+
+def decode_wav(path, rate=RATE):
+    """Return a WAV file as mono signed 16-bit samples at rate."""
+    with wave.open(path, 'rb') as w:
+        channels, width, src_rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        frames = w.readframes(w.getnframes())
+    if width != 2:
+        raise ValueError(f'{path}: only 16-bit PCM is supported')
+    samples = array('h', frames)
+    if channels > 1:
+        samples = array('h', (sum(samples[i:i + channels]) // channels
+                              for i in range(0, len(samples), channels)))
+    if src_rate != rate and samples:
+        step = src_rate / rate
+        samples = array('h', (samples[int(i * step)]
+                              for i in range(int(len(samples) / step))))
+    return samples
+
+
+def trim(samples, threshold=SILENCE):
+    """Drop leading and trailing silence."""
+    start, end = 0, len(samples)
+    while start < end and abs(samples[start]) < threshold:
+        start += 1
+    while end > start and abs(samples[end - 1]) < threshold:
+        end -= 1
+    return samples[start:end]
+
+
+class ClipPlayer:
+    """A raw PCM player process kept open between clips.
+
+    A worker thread writes the audio in short slices paced to the playback
+    clock, so no more than lead_ms is ever queued ahead of the player.
+    play() never blocks: it replaces whatever has not been written yet, so
+    a quick second tap cuts the first sound short instead of queueing
+    behind it.
+    """
+
+    def __init__(self, rate=RATE, latency_ms=LATENCY_MS, lead_ms=LEAD_MS):
+        self.rate = rate
+        self.latency_ms = latency_ms
+        self.lead_ms = lead_ms
+        # None until a player has been started (or failed to start).
+        self.available = None
+        # Request to audible sound, estimated from the playback clock.
+        self.latency = speech_worker.LatencyCounter()
+        self._proc = None
+        self._pending = None
+        self._clock = 0.0       # monotonic time the written audio ends
+        self._closed = False
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def open(self):
+        """Start the player ahead of the first clip."""
+        with self._cond:
+            self._start()
+
+    def play(self, pcm):
+        """Queue PCM bytes, replacing audio not written yet. Returns False
+        when no player could be started."""
+        if self.available is False:
+            return False
+        with self._cond:
+            self._pending = (pcm, time.monotonic())
+            self._start()
+            self._cond.notify()
+        return True
+
+    def _start(self):
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name='clip-player', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        self._spawn()
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                pcm, requested = self._pending
+                self._pending = None
+            self._write(pcm, requested)
+
+    def _spawn(self):
+        """Start the player if it is not running. Returns True if it was."""
+        if self._proc is not None and self._proc.poll() is None:
+            return True
+        try:
+            self._proc = speech_worker.raw_player(self.rate, self.latency_ms)
+            self.available = True
+        except FileNotFoundError:
+            self._proc = None
+            self.available = False
+        self._clock = 0.0
+        return False
+
+    def _write(self, pcm, requested):
+        step = 2 * (self.rate * SLICE_MS // 1000)
+        lead = self.lead_ms / 1000
+        pos = failures = 0
+        while pos < len(pcm):
+            with self._cond:
+                ahead = self._clock - time.monotonic()
+                if ahead > lead and self._pending is None and not self._closed:
+                    self._cond.wait(ahead - lead)
+                if self._pending is not None or self._closed:
+                    return      # superseded; at most lead_ms is still queued
+                if self._clock - time.monotonic() > lead:
+                    continue
+            warm = self._spawn()
+            proc = self._proc
+            if proc is None:
+                return
+            chunk = pcm[pos:pos + step]
+            try:
+                proc.stdin.write(chunk)
+                proc.stdin.flush()
+            except (OSError, ValueError):
+                # The player died; restart it once, then give up on this clip.
+                self._proc = None
+                failures += 1
+                if failures > 1:
+                    return
+                continue
+            now = time.monotonic()
+            start = max(now, self._clock)
+            if pos == 0:
+                self.latency.record(start + self.latency_ms / 1000 - requested, cold=not warm)
+            self._clock = start + len(chunk) / (2 * self.rate)
+            pos += step
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            proc, self._proc = self._proc, None
+        if proc is not None:
+            try:
+                proc.kill()
+                proc.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+
+
+class SoundBank:
+    """In-memory clips for the tile sounds, keyed like SOUNDS."""
+
+    def __init__(self, sounds=SOUNDS, lang='sv', rate=RATE, clip_dirs=None):
+        self.sounds = dict(sounds)
+        self.lang = lang
+        self.rate = rate
+        self.clip_dirs = sound_dirs() if clip_dirs is None else clip_dirs
+        self._clips = {}
+        self._player = ClipPlayer(rate)
+        self._loaded = threading.Event()
+        self.latency = self._player.latency
+
+    def load(self):
+        """Decode every clip into memory. Returns the number loaded."""
+        clips = {}
+        for key in self.sounds:
+            path = self._recorded(key) or self._rendered(key)
+            if not path:
+                continue
+            try:
+                samples = trim(decode_wav(path, self.rate))
+            except (OSError, EOFError, ValueError, wave.Error):
+                continue
+            if samples:
+                clips[key] = samples.tobytes()
+        self._clips = clips
+        if clips:
+            self._player.open()
+        self._loaded.set()
+        return len(clips)
+
+    def load_async(self):
+        thread = threading.Thread(target=self.load, name='sound-bank', daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def loaded(self):
+        return self._loaded.is_set()
+
+    def _recorded(self, key):
+        for directory in self.clip_dirs:
+            path = os.path.join(directory, key.lower() + '.wav')
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _rendered(self, key):
+        text = self.sounds[key]
+        return speech_cache.get_cache().get_or_render(
+            'espeak-phoneme', self.lang, self.lang, text,
+            lambda dest: phonetics._render_espeak(text, self.lang, dest))
+
+    def clip(self, key):
+        """PCM bytes for one sound, or None.
+
+        A doubled consonant (LL, TT) sounds like the single one.
+        """
+        key = key.upper()
+        pcm = self._clips.get(key)
+        if pcm is None and len(key) > 1 and len(set(key)) == 1:
+            pcm = self._clips.get(key[0])
+        return pcm
+
+    def word(self, keys, gap_ms=GAP_MS):
+        """Clips for keys joined with short pauses, as PCM bytes."""
+        gap = bytes(2 * (self.rate * gap_ms // 1000))
+        return gap.join(c for c in (self.clip(k) for k in keys) if c)
+
+    def play(self, key):
+        """Play one sound. Returns False if it is not loaded."""
+        return self._play(self.clip(key))
+
+    def play_word(self, keys, gap_ms=GAP_MS):
+        return self._play(self.word(keys, gap_ms))
+
+    def _play(self, pcm):
+        return bool(pcm) and self._player.play(pcm)
+
+    def close(self):
+        self._player.close()
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_bank():
+    """Return the shared sound bank; call load_async() on it once."""
+    global _bank
+    with _bank_lock:
+        if _bank is None:
+            _bank = SoundBank()
+        return _bank
+
+
+def shutdown():
+    with _bank_lock:
+        if _bank is not None:
+            _bank.close()
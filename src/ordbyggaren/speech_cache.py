@@ -0,0 +1,158 @@
+"""Content-addressed on-disk cache for synthesized speech."""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def default_cache_dir():
+    xdg = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(xdg, "ordbyggaren", "speech")
+
+
+def cache_key(engine, voice, lang, text):
+    """Return the content address for one utterance."""
+    raw = "\0".join([engine or "", voice or "", lang or "", text])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SpeechCache:
+    """WAV files keyed by engine, voice, language and text.
+
+    Files are written atomically (temp file + rename) and the total size
+    is kept under max_bytes by evicting the least recently used entries.
+    Recency survives restarts through the file modification time.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self._dir = directory or default_cache_dir()
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = None
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self._dir, key[:2], key + ".wav")
+
+    def _load_index(self):
+        entries = []
+        if os.path.isdir(self._dir):
+            for sub in os.listdir(self._dir):
+                subdir = os.path.join(self._dir, sub)
+                if not os.path.isdir(subdir):
+                    continue
+                for f in os.listdir(subdir):
+                    if not f.endswith(".wav"):
+                        continue
+                    try:
+                        st = os.stat(os.path.join(subdir, f))
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, f[:-4], st.st_size))
+        entries.sort()
+        self._index = OrderedDict((key, size) for _mtime, key, size in entries)
+        self._total = sum(self._index.values())
+
+    def _ensure_index(self):
+        if self._index is None:
+            self._load_index()
+
+    def contains(self, engine, voice, lang, text):
+        key = cache_key(engine, voice, lang, text)
+        with self._lock:
+            self._ensure_index()
+            return key in self._index
+
+    def get(self, engine, voice, lang, text):
+        """Return the cached WAV path, or None on a miss."""
+        key = cache_key(engine, voice, lang, text)
+        with self._lock:
+            self._ensure_index()
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._drop(key)
+            return None
+        return path
+
+    def put(self, engine, voice, lang, text, render):
+        """Store the output of render(tmp_path) and return the cached path.
+
+        render writes a WAV file to the given path and returns True on
+        success. Nothing is stored if it fails.
+        """
+        key = cache_key(engine, voice, lang, text)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            if not render(tmp) or os.path.getsize(tmp) == 0:
+                return None
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._ensure_index()
+            self._total -= self._index.pop(key, 0)
+            self._index[key] = size
+            self._total += size
+            self._evict()
+        return path
+
+    def get_or_render(self, engine, voice, lang, text, render):
+        return (self.get(engine, voice, lang, text)
+                or self.put(engine, voice, lang, text, render))
+
+    def _drop(self, key):
+        self._total -= self._index.pop(key, 0)
+
+    def _evict(self):
+        while self._total > self._max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total -= size
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            self._ensure_index()
+            return {"entries": len(self._index), "bytes": self._total,
+                    "max_bytes": self._max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._index = OrderedDict()
+            self._total = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the shared speech cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SpeechCache()
+        return _cache
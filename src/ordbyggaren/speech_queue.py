@@ -0,0 +1,155 @@
+"""Speech scheduler: one playback channel with preemption and merging."""
+import subprocess
+import threading
+from collections import deque
+
+from ordbyggaren import phonetics
+
+
+class SpeechScheduler:
+    """Plays speech requests one at a time on a background thread.
+
+    submit() never blocks, so it is safe to call from the GTK main loop.
+    A new request cancels the one that is playing, a request identical to
+    one already queued is merged into it, and when more than max_pending
+    requests are waiting the oldest is dropped.
+    """
+
+    def __init__(self, speak=phonetics.speak, max_pending=1):
+        self._speak = speak
+        self._max_pending = max_pending
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._current = None
+        self._handle = None
+        self._generation = 0
+        self._thread = None
+        self._closed = False
+        self.submitted = 0
+        self.merged = 0
+        self.dropped = 0
+        self.cancelled = 0
+        self.played = 0
+
+    def submit(self, text, lang='sv', **kwargs):
+        """Queue text for playback, preempting whatever is playing."""
+        if not text:
+            return
+        request = (text, lang, tuple(sorted(kwargs.items())))
+        with self._cond:
+            if self._closed:
+                return
+            self.submitted += 1
+            if request in self._pending:
+                self.merged += 1
+                return
+            self._pending.append(request)
+            while len(self._pending) > self._max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._cancel_current()
+            self._ensure_thread()
+            self._cond.notify()
+
+    def cancel(self):
+        """Stop playback and forget every queued request."""
+        with self._cond:
+            self.dropped += len(self._pending)
+            self._pending.clear()
+            self._cancel_current()
+
+    def _cancel_current(self):
+        if self._current is None:
+            return
+        self._generation += 1
+        self.cancelled += 1
+        self._current = None
+        if self._handle is not None:
+            _terminate(self._handle)
+            self._handle = None
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='speech-queue',
+                                            daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                request = self._current = self._pending.popleft()
+                generation = self._generation
+            text, lang, options = request
+            try:
+                handle = self._speak(text, lang, **dict(options))
+            except Exception:
+                handle = None
+            with self._cond:
+                if generation != self._generation:
+                    # Cancelled while the audio was being synthesized.
+                    if handle is not None:
+                        _terminate(handle)
+                    continue
+                self._handle = handle
+            if handle is not None:
+                try:
+                    handle.wait()
+                except (OSError, subprocess.SubprocessError):
+                    pass
+            with self._cond:
+                if generation == self._generation:
+                    self._current = None
+                    self._handle = None
+                    self.played += 1
+
+    def stats(self):
+        """Return queue depth and request counters."""
+        with self._cond:
+            return {
+                'depth': len(self._pending),
+                'playing': self._current is not None,
+                'submitted': self.submitted,
+                'merged': self.merged,
+                'dropped': self.dropped,
+                'cancelled': self.cancelled,
+                'played': self.played,
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._cancel_current()
+            self._cond.notify_all()
+
+
+def _terminate(handle):
+    try:
+        handle.terminate()
+    except (OSError, AttributeError):
+        pass
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the shared speech scheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = SpeechScheduler()
+        return _scheduler
+
+
+def shutdown():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.close()
+            _scheduler = None
@@ -0,0 +1,524 @@
+"""Long-lived Piper TTS workers that keep each voice model loaded."""
+import atexit
+import json
+import os
+import queue
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from collections import deque
+
+# Playback buffer asked of the raw player: audio written to it is heard
+# about this much later.
+PLAYER_LATENCY_MS = 50
+
+
+class LatencyCounter:
+    """Collects cold (process start) and warm request latencies."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cold = []
+        self._warm = []
+
+    def record(self, seconds, cold=False):
+        with self._lock:
+            (self._cold if cold else self._warm).append(seconds)
+
+    def summary(self):
+        """Return request counts and average latencies in milliseconds."""
+        with self._lock:
+            cold, warm = list(self._cold), list(self._warm)
+        return {
+            "cold_count": len(cold),
+            "cold_ms": round(sum(cold) / len(cold) * 1000, 1) if cold else None,
+            "warm_count": len(warm),
+            "warm_ms": round(sum(warm) / len(warm) * 1000, 1) if warm else None,
+        }
+
+
+class PiperWorker:
+    """One persistent piper process for a single voice model.
+
+    Piper reads one utterance per line on stdin. With --output_dir it
+    writes a WAV file per line and prints the file path on stdout, so the
+    model is loaded once and reused for every request. Each file is moved
+    to the caller's destination at once; nothing is kept in the output
+    directory.
+    """
+
+    def __init__(self, model=None, timeout=10):
+        self.model = model
+        self.timeout = timeout
+        self.restarts = 0
+        self.latency = LatencyCounter()
+        self._dir = tempfile.mkdtemp(prefix="ordbyggaren-piper-")
+        self._proc = None
+        self._lines = None
+        self._spawned = False
+        self._lock = threading.Lock()
+
+    def alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def _spawn(self):
+        cmd = ['piper', '--output_dir', self._dir]
+        if self.model:
+            cmd.extend(['--model', self.model])
+        self._proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, text=True, encoding='utf-8', bufsize=1
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read_lines, args=(self._proc, self._lines),
+                         daemon=True).start()
+        if self._spawned:
+            self.restarts += 1
+        self._spawned = True
+
+    @staticmethod
+    def _read_lines(proc, lines):
+        for line in proc.stdout:
+            lines.put(line.strip())
+        lines.put(None)
+
+    def _kill(self):
+        if self._proc is None:
+            return
+        try:
+            self._proc.kill()
+            self._proc.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        self._proc = None
+        self._clear()
+
+    def _clear(self):
+        """Delete files left in the output directory, e.g. by a request
+        that timed out before piper finished it."""
+        try:
+            names = os.listdir(self._dir)
+        except OSError:
+            return
+        for name in names:
+            try:
+                os.remove(os.path.join(self._dir, name))
+            except OSError:
+                pass
+
+    def synthesize(self, text, dest):
+        """Render text into the WAV file dest. Returns True on success.
+
+        A crashed or hung process is restarted once before giving up.
+        Raises FileNotFoundError if piper is not installed.
+        """
+        line = ' '.join(text.split())
+        if not line:
+            return False
+        with self._lock:
+            for _attempt in range(2):
+                cold = not self.alive()
+                if cold:
+                    self._kill()
+                    self._spawn()
+                start = time.monotonic()
+                try:
+                    self._proc.stdin.write(line + '\n')
+                    self._proc.stdin.flush()
+                    path = self._lines.get(timeout=self.timeout)
+                except (OSError, ValueError, queue.Empty):
+                    path = None
+                if path and os.path.exists(path):
+                    self.latency.record(time.monotonic() - start, cold=cold)
+                    try:
+                        shutil.move(path, dest)
+                        return True
+                    except OSError:
+                        self._clear()
+                        return False
+                self._kill()
+        return False
+
+    def close(self):
+        with self._lock:
+            if self._proc is not None:
+                try:
+                    self._proc.stdin.close()
+                    self._proc.wait(timeout=2)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+            self._kill()
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+
+class PiperStream:
+    """Persistent piper --output-raw process piped into a raw PCM player.
+
+    Audio is forwarded to the player chunk by chunk as piper produces it,
+    so playback starts with the first synthesized chunk instead of after a
+    whole WAV file has been written. Requests are sent to piper one at a
+    time: an utterance ends when its audio has gone quiet for GAP seconds,
+    and only then is the next line written, so no audio is attributed to
+    the wrong request.
+
+    Cancelling a request only stops the player: piper and its loaded voice
+    keep running, and the rest of that utterance is not played. The
+    utterance's whole PCM still goes to its on_pcm callback, so it can be
+    kept in the speech cache without rendering it a second time.
+    """
+
+    CHUNK = 4096
+    GAP = 0.05
+
+    def __init__(self, model=None):
+        self.model = model
+        self.sample_rate = _sample_rate(model)
+        self._piper = None
+        self._player = None
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._play_until = 0.0
+
+    def alive(self):
+        return self._piper is not None and self._piper.poll() is None
+
+    def _spawn(self):
+        cmd = ['piper', '--output-raw']
+        if self.model:
+            cmd.extend(['--model', self.model])
+        self._piper = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        threading.Thread(target=self._pump, args=(self._piper,), daemon=True).start()
+
+    def _pump(self, piper):
+        fd = piper.stdout.fileno()
+        while True:
+            try:
+                ready = select.select([fd], [], [], self.GAP)[0]
+                chunk = os.read(fd, self.CHUNK) if ready else None
+            except (OSError, ValueError):
+                break
+            if chunk == b'':
+                break
+            finished = player = None
+            with self._cond:
+                if chunk is None:
+                    finished = self._finish()
+                else:
+                    player = self._route(chunk)
+            if player is not None:
+                try:
+                    player.stdin.write(chunk)
+                    player.stdin.flush()
+                except (OSError, ValueError):
+                    pass        # cancelled meanwhile
+            if finished is not None and finished.on_pcm is not None:
+                try:
+                    finished.on_pcm(bytes(finished.pcm))
+                except Exception:
+                    pass
+        with self._cond:
+            if self._piper is piper:
+                self._fail()
+
+    def _route(self, chunk):
+        """Account for a chunk of the oldest request; return the player to
+        write it to, or None when it is not to be played."""
+        if not self._queue:
+            return None
+        utterance = self._queue[0]
+        utterance.pcm += chunk
+        if utterance.cancelled:
+            return None
+        if self._player is None or self._player.poll() is not None:
+            try:
+                self._player = raw_player(self.sample_rate, PLAYER_LATENCY_MS)
+            except FileNotFoundError:
+                self._player = None
+                return None
+        now = time.monotonic()
+        if not utterance.heard:
+            utterance.heard = True
+            # Heard once the audio still queued and the player's buffer
+            # have played.
+            audible = max(now, self._play_until) + PLAYER_LATENCY_MS / 1000
+            first_audio['stream'].record(audible - utterance.start, cold=utterance.cold)
+        # Estimate when the player will have drained this chunk.
+        self._play_until = (max(self._play_until, now)
+                            + len(chunk) / (2.0 * self.sample_rate))
+        utterance.play_until = self._play_until + PLAYER_LATENCY_MS / 1000
+        return self._player
+
+    def _finish(self):
+        """End the oldest request once its audio has gone quiet, and send
+        the next one."""
+        if not self._queue or not self._queue[0].pcm:
+            return None
+        utterance = self._queue.popleft()
+        utterance.done = True
+        self._send_next()
+        self._cond.notify_all()
+        return utterance
+
+    def _send_next(self):
+        # Requests cancelled before they were sent are never rendered.
+        while self._queue and self._queue[0].cancelled:
+            self._queue.popleft().done = True
+        if not self._queue:
+            return True
+        try:
+            self._piper.stdin.write(self._queue[0].line)
+            self._piper.stdin.flush()
+            return True
+        except (OSError, ValueError, AttributeError):
+            return False
+
+    def _fail(self):
+        for utterance in self._queue:
+            utterance.done = utterance.cancelled = True
+            utterance.on_pcm = None
+        self._queue.clear()
+        self._cond.notify_all()
+
+    def say(self, text, on_pcm=None):
+        """Queue text for streaming playback and return its handle, with
+        wait() and terminate() like Popen.
+
+        on_pcm(bytes) is called with the utterance's signed 16-bit mono PCM
+        once piper has produced all of it. Raises FileNotFoundError if
+        piper is missing.
+        """
+        line = ' '.join(text.split())
+        if not line:
+            return None
+        with self._cond:
+            for _attempt in range(2):
+                cold = not self.alive()
+                if cold:
+                    self._stop()
+                    self._spawn()
+                utterance = _Utterance(self, (line + '\n').encode('utf-8'),
+                                       time.monotonic(), cold, on_pcm)
+                self._queue.append(utterance)
+                if len(self._queue) > 1 or self._send_next():
+                    return utterance
+                self._queue.remove(utterance)
+        return None
+
+    def _wait(self, utterance, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not utterance.cancelled:
+                now = time.monotonic()
+                if utterance.done and now >= utterance.play_until:
+                    return
+                if deadline is not None and now >= deadline:
+                    raise subprocess.TimeoutExpired('piper', timeout)
+                self._cond.wait(0.02)
+
+    def _cancel(self, utterance):
+        with self._cond:
+            if utterance.cancelled:
+                return
+            utterance.cancelled = True
+            # Drop what the player still holds; the next played chunk
+            # starts a new one.
+            if utterance.heard and time.monotonic() < utterance.play_until:
+                _kill(self._player)
+                self._player = None
+                self._play_until = 0.0
+            self._cond.notify_all()
+
+    def _stop(self):
+        _kill(self._piper)
+        _kill(self._player)
+        self._piper = self._player = None
+        self._fail()
+
+    def stop(self):
+        """Stop piper and playback; the next say() restarts the pipeline."""
+        with self._cond:
+            self._stop()
+
+    def close(self):
+        self.stop()
+
+
+class _Utterance:
+    """One PiperStream request and its playback handle."""
+
+    def __init__(self, stream, line, start, cold, on_pcm):
+        self._stream = stream
+        self.line = line
+        self.start = start
+        self.cold = cold
+        self.on_pcm = on_pcm
+        self.pcm = bytearray()
+        self.heard = False
+        self.done = False
+        self.cancelled = False
+        self.play_until = 0.0
+
+    def wait(self, timeout=None):
+        """Block until the utterance has played or was cancelled."""
+        self._stream._wait(self, timeout)
+
+    def terminate(self):
+        self._stream._cancel(self)
+
+
+def _kill(proc):
+    if proc is None:
+        return
+    try:
+        proc.kill()
+        proc.wait(timeout=2)
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+
+def write_wav(path, pcm, rate):
+    """Write signed 16-bit mono PCM as a WAV file. Returns True."""
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm)
+    return True
+
+
+class WavPlayback:
+    """Plays a 16-bit mono WAV file by piping its samples to a raw player.
+
+    Feeding the player ourselves tells when the first samples reach it;
+    they are heard PLAYER_LATENCY_MS later. Has wait() and terminate()
+    like Popen. Raises ValueError for other sample formats and
+    FileNotFoundError without a player.
+    """
+
+    CHUNK = 4096
+
+    def __init__(self, path, on_first_audio=None):
+        with wave.open(path, 'rb') as w:
+            if w.getsampwidth() != 2 or w.getnchannels() != 1:
+                raise ValueError('not 16-bit mono')
+            rate = w.getframerate()
+            pcm = w.readframes(w.getnframes())
+        self._player = raw_player(rate, PLAYER_LATENCY_MS)
+        threading.Thread(target=self._feed, args=(pcm, on_first_audio),
+                         daemon=True).start()
+
+    def _feed(self, pcm, on_first_audio):
+        stdin = self._player.stdin
+        try:
+            for i in range(0, len(pcm), self.CHUNK):
+                stdin.write(pcm[i:i + self.CHUNK])
+                stdin.flush()
+                if i == 0 and on_first_audio:
+                    on_first_audio(time.monotonic() + PLAYER_LATENCY_MS / 1000)
+            stdin.close()
+        except (OSError, ValueError):
+            pass
+
+    def wait(self, timeout=None):
+        return self._player.wait(timeout)
+
+    def terminate(self):
+        try:
+            self._player.kill()
+        except OSError:
+            pass
+
+
+def _sample_rate(model, default=22050):
+    """Read the sample rate from the voice's .onnx.json config."""
+    if not model:
+        return default
+    try:
+        with open(model + '.json', encoding='utf-8') as f:
+            return int(json.load(f)['audio']['sample_rate'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return default
+
+
+def raw_player(rate, latency_ms=None):
+    """Start a player that reads signed 16-bit mono PCM from stdin.
+
+    latency_ms asks for a small playback buffer, for short sounds that
+    must start at once.
+    """
+    paplay = ['paplay', '--raw', f'--rate={rate}', '--format=s16le', '--channels=1']
+    aplay = ['aplay', '-q', '-t', 'raw', '-r', str(rate), '-f', 'S16_LE', '-c', '1']
+    if latency_ms:
+        paplay.append(f'--latency-msec={latency_ms}')
+        aplay.extend(['-B', str(latency_ms * 1000)])
+    commands = [paplay, aplay]
+    for cmd in commands:
+        try:
+            return subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                    stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.DEVNULL)
+        except FileNotFoundError:
+            continue
+    raise FileNotFoundError('paplay/aplay')
+
+
+# Time from request until the first audio is heard (handed to the player
+# plus its buffer), per playback path. For 'stream' a cold request is one
+# that had to start the pipeline; for 'file' it is one that had to
+# synthesize (speech cache miss).
+first_audio = {'file': LatencyCounter(), 'stream': LatencyCounter()}
+
+_workers = {}
+_workers_lock = threading.Lock()
+_streams = {}
+
+
+def get_worker(model=None):
+    """Return the shared worker for a voice model, creating it on demand."""
+    with _workers_lock:
+        worker = _workers.get(model)
+        if worker is None:
+            worker = _workers[model] = PiperWorker(model)
+        return worker
+
+
+def get_stream(model=None):
+    """Return the shared streaming pipeline for a voice model."""
+    with _workers_lock:
+        stream = _streams.get(model)
+        if stream is None:
+            stream = _streams[model] = PiperStream(model)
+        return stream
+
+
+def first_audio_stats():
+    """Return time-to-first-audio summaries for the file and stream paths."""
+    return {path: counter.summary() for path, counter in first_audio.items()}
+
+
+def latency_stats():
+    """Return latency summaries keyed by voice model path."""
+    with _workers_lock:
+        workers = list(_workers.items())
+    return {model: dict(w.latency.summary(), restarts=w.restarts)
+            for model, w in workers}
+
+
+def shutdown():
+    """Stop all workers. Called on application shutdown and at exit."""
+    with _workers_lock:
+        workers = list(_workers.values()) + list(_streams.values())
+        _workers.clear()
+        _streams.clear()
+    for worker in workers:
+        worker.close()
+
+
+atexit.register(shutdown)
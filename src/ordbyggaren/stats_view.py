@@ -0,0 +1,92 @@
+"""Learning statistics dialog."""
+import gettext
+
+import gi
+gi.require_version('Gtk', '4.0')
+gi.require_version('Adw', '1')
+from gi.repository import Gtk, Adw
+
+_ = gettext.gettext
+
+WORD_ROWS = 10
+PAIR_ROWS = 8
+TREND_DAYS = 14
+
+
+class StatsView(Adw.Dialog):
+    """Shows a LearningStats object.
+
+    Everything is read from the counters the session keeps up to date, and
+    the page is only rebuilt when they changed since the last refresh.
+    """
+
+    def __init__(self, stats):
+        super().__init__(title=_("Statistics"), content_width=420, content_height=560)
+        self.stats = stats
+        self._version = None
+        toolbar = Adw.ToolbarView()
+        toolbar.add_top_bar(Adw.HeaderBar())
+        self._scroller = Gtk.ScrolledWindow(vexpand=True)
+        toolbar.set_content(self._scroller)
+        self.set_child(toolbar)
+
+    def refresh(self, stats=None):
+        if stats is not None and stats is not self.stats:
+            self.stats = stats
+            self._version = None
+        if self._version == self.stats.version:
+            return
+        self._version = self.stats.version
+        self._scroller.set_child(self._build_page())
+
+    def _build_page(self):
+        stats = self.stats
+        page = Adw.PreferencesPage()
+
+        overview = Adw.PreferencesGroup(title=_("Overview"))
+        overview.add(_row(_("Answers"), str(stats.seen)))
+        overview.add(_accuracy_row(_("Correct"), stats.accuracy()))
+        page.add(overview)
+
+        words = Adw.PreferencesGroup(title=_("Hardest words"))
+        rows = stats.word_accuracy()[:WORD_ROWS]
+        for word, seen, _correct, accuracy in rows:
+            words.add(_accuracy_row(word, accuracy, _("%d answers") % seen))
+        if not rows:
+            words.add(_row(_("No answers yet"), ""))
+        page.add(words)
+
+        positions = Adw.PreferencesGroup(title=_("Accuracy by letter position"))
+        for position, seen, _correct, accuracy in stats.position_accuracy():
+            positions.add(_accuracy_row(_("Letter %d") % (position + 1), accuracy,
+                                        _("%d answers") % seen))
+        page.add(positions)
+
+        pairs = Adw.PreferencesGroup(title=_("Confused letters"),
+                                     description=_("Expected letter → letter placed"))
+        for expected, placed, count in stats.confused_pairs(PAIR_ROWS):
+            pairs.add(_row(f"{expected} → {placed}", str(count)))
+        page.add(pairs)
+
+        trend = Adw.PreferencesGroup(title=_("Last days"))
+        for day, seen, _correct, accuracy in reversed(stats.trend(TREND_DAYS)):
+            trend.add(_accuracy_row(day, accuracy, _("%d answers") % seen))
+        page.add(trend)
+        return page
+
+
+def _row(title, value):
+    row = Adw.ActionRow(title=title)
+    row.add_suffix(Gtk.Label(label=value, css_classes=["dim-label"]))
+    return row
+
+
+def _accuracy_row(title, accuracy, subtitle=None):
+    row = Adw.ActionRow(title=title)
+    if subtitle:
+        row.set_subtitle(subtitle)
+    bar = Gtk.LevelBar(min_value=0, max_value=1, value=accuracy,
+                       valign=Gtk.Align.CENTER, width_request=100)
+    row.add_suffix(bar)
+    row.add_suffix(Gtk.Label(label=f"{accuracy:.0%}", width_chars=4, xalign=1))
+    return row
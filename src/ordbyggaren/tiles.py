@@ -0,0 +1,82 @@
+"""Pooled letter tiles and answer slots that are reused between words."""
+import gi
+gi.require_version('Gtk', '4.0')
+from gi.repository import Gtk
+
+
+class TilePool:
+    """Letter-tile buttons in a FlowBox, created once and relabelled.
+
+    Only labels, sensitivity and visibility that actually change are
+    touched, so a new word or a clear does not reallocate widgets.
+    """
+
+    def __init__(self, flowbox, on_clicked):
+        self._box = flowbox
+        self._on_clicked = on_clicked
+        self._buttons = []
+        self._letters = []
+
+    def _grow(self, n):
+        while len(self._buttons) < n:
+            btn = Gtk.Button()
+            btn.add_css_class("title-3")
+            btn.set_size_request(50, 50)
+            btn.connect("clicked", self._clicked, len(self._buttons))
+            self._box.insert(btn, -1)
+            self._buttons.append(btn)
+
+    def set_letters(self, letters):
+        """Show one enabled tile per letter, hiding any spare tiles."""
+        letters = list(letters)
+        self._grow(len(letters))
+        for i, btn in enumerate(self._buttons):
+            visible = i < len(letters)
+            if visible:
+                if btn.get_label() != letters[i]:
+                    btn.set_label(letters[i])
+                if not btn.get_sensitive():
+                    btn.set_sensitive(True)
+            child = btn.get_parent()
+            if child.get_visible() != visible:
+                child.set_visible(visible)
+        self._letters = letters
+
+    def restore(self):
+        """Re-enable every tile in place, keeping the current order."""
+        for btn in self._buttons[:len(self._letters)]:
+            if not btn.get_sensitive():
+                btn.set_sensitive(True)
+
+    @property
+    def letters(self):
+        return list(self._letters)
+
+    def _clicked(self, btn, index):
+        self._on_clicked(btn, self._letters[index])
+
+
+class SlotRow:
+    """Answer slot labels in a Box, updated only where the text changed."""
+
+    def __init__(self, box, placeholder="_"):
+        self._box = box
+        self._placeholder = placeholder
+        self._labels = []
+
+    def show(self, length, letters):
+        """Show length slots filled with letters, then placeholders."""
+        while len(self._labels) < length:
+            lbl = Gtk.Label(label=self._placeholder)
+            lbl.add_css_class("title-2")
+            lbl.set_size_request(40, 40)
+            self._box.append(lbl)
+            self._labels.append(lbl)
+        for i, lbl in enumerate(self._labels):
+            visible = i < length
+            if visible:
+                text = letters[i] if i < len(letters) else self._placeholder
+                if lbl.get_label() != text:
+                    lbl.set_label(text)
+            if lbl.get_visible() != visible:
+                lbl.set_visible(visible)
@@ -0,0 +1,162 @@
+"""Registry of installed TTS engines and Piper voices."""
+import os
+import shutil
+import threading
+from collections import namedtuple
+
+VOICE_DIR = os.path.expanduser('~/.local/share/piper/voices')
+
+# Piper quality levels, most preferred first.
+QUALITIES = ('medium', 'high', 'low', 'x_low')
+
+Voice = namedtuple('Voice', 'key lang name quality path')
+
+
+def parse_voice(filename, directory):
+    """Parse a Piper model file name such as sv_SE-nst-medium.onnx."""
+    if not filename.endswith('.onnx'):
+        return None
+    stem = filename[:-5]
+    parts = stem.split('-')
+    lang = parts[0]
+    quality = parts[-1] if len(parts) > 2 and parts[-1] in QUALITIES else ''
+    name = '-'.join(parts[1:-1] if quality else parts[1:]) or stem
+    return Voice(stem, lang, name, quality, os.path.join(directory, filename))
+
+
+class VoiceRegistry:
+    """Engines and voices, discovered once and rescanned on change.
+
+    The voice directory is polled on a background thread, so looking up
+    a voice never touches the filesystem.
+    """
+
+    def __init__(self, voice_dir=VOICE_DIR, poll_interval=2.0):
+        self._voice_dir = voice_dir
+        self._poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._engines = {}
+        self._voices = []
+        self._preferred = {}
+        self._resolved = {}
+        self._stamp = None
+        self._watcher = None
+        self._stop = threading.Event()
+        self.refresh()
+
+    def _dir_stamp(self):
+        try:
+            return os.stat(self._voice_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self):
+        """Rescan engines and the voice directory."""
+        engines = {'piper': shutil.which('piper'),
+                   'espeak': shutil.which('espeak-ng')}
+        stamp = self._dir_stamp()
+        voices = []
+        if stamp is not None:
+            try:
+                names = sorted(os.listdir(self._voice_dir))
+            except OSError:
+                names = []
+            for f in names:
+                voice = parse_voice(f, self._voice_dir)
+                if voice:
+                    voices.append(voice)
+        with self._lock:
+            self._engines = engines
+            self._voices = voices
+            self._stamp = stamp
+            self._resolved.clear()
+
+    def watch(self):
+        """Start polling the voice directory for added or removed voices."""
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._poll, name='voice-watch',
+                                         daemon=True)
+        self._watcher.start()
+
+    def _poll(self):
+        while not self._stop.wait(self._poll_interval):
+            if self._dir_stamp() != self._stamp:
+                self.refresh()
+
+    def stop(self):
+        self._stop.set()
+
+    def has_engine(self, engine):
+        return self._engines.get(engine) is not None
+
+    def default_engine(self):
+        """Return 'piper', 'espeak' or None."""
+        if self.has_engine('piper'):
+            return 'piper'
+        if self.has_engine('espeak'):
+            return 'espeak'
+        return None
+
+    def voices(self, lang=None):
+        """Return installed Piper voices, optionally for one language."""
+        with self._lock:
+            voices = list(self._voices)
+        if lang is None:
+            return voices
+        return [v for v in voices if _lang_matches(v.lang, lang)]
+
+    def select(self, lang, name=None, quality=None):
+        """Prefer a voice (key or name) and/or quality level for a language.
+
+        Passing neither clears the preference.
+        """
+        with self._lock:
+            if name is None and quality is None:
+                self._preferred.pop(lang, None)
+            else:
+                self._preferred[lang] = (name, quality)
+            self._resolved.pop(lang, None)
+
+    def voice_for(self, lang):
+        """Return the Voice to use for a language, or None."""
+        with self._lock:
+            if lang in self._resolved:
+                return self._resolved[lang]
+            name, quality = self._preferred.get(lang, (None, None))
+            candidates = [v for v in self._voices if _lang_matches(v.lang, lang)]
+            if name is not None:
+                candidates = [v for v in candidates
+                              if name in (v.key, v.name)] or candidates
+            order = list(QUALITIES)
+            if quality in order:
+                order.remove(quality)
+                order.insert(0, quality)
+            candidates.sort(key=lambda v: order.index(v.quality)
+                            if v.quality in order else len(order))
+            voice = candidates[0] if candidates else None
+            self._resolved[lang] = voice
+            return voice
+
+    def model_for(self, lang):
+        """Return the Piper model path for a language, or None."""
+        voice = self.voice_for(lang)
+        return voice.path if voice else None
+
+
+def _lang_matches(voice_lang, lang):
+    return voice_lang.startswith(lang)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the shared registry, scanning and starting the watcher once."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = VoiceRegistry()
+            _registry.watch()
+        return _registry
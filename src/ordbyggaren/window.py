@@ -1,9 +1,5 @@
 """Main window for Ordbyggaren - Phonological training."""
-import json
-import random
-import subprocess
 import gettext
-from datetime import datetime
 from pathlib import Path
 
 import gi
@@ -13,39 +9,46 @@ from gi.repository import Gtk, Adw, Gio, GLib, Gdk
 
 _ = gettext.gettext
 
-from ordbyggaren.export import show_export_dialog
-
-# Word lists by difficulty
-WORDS = {
-    _("Easy"): [
-        ("sol", "☀️"), ("bil", "🚗"), ("hus", "🏠"), ("bok", "📖"),
-        ("mat", "🍽️"), ("ko", "🐄"), ("is", "🍦"), ("uv", "🦉"),
-    ],
-    _("Medium"): [
-        ("katt", "🐱"), ("hund", "🐕"), ("fisk", "🐟"), ("skog", "🌲"),
-        ("boll", "⚽"), ("lamm", "🐑"), ("ring", "💍"), ("sand", "🏖️"),
-    ],
-    _("Hard"): [
-        ("skola", "🏫"), ("blomma", "🌸"), ("vatten", "💧"), ("stjärna", "⭐"),
-        ("groda", "🐸"), ("morot", "🥕"), ("cykel", "🚲"), ("papper", "📄"),
-    ],
-}
+from ordbyggaren import alignment, dawg, journal, lexicon, phonetics, sound_bank, speech_queue
+from ordbyggaren.export import cancel_pdf_exports, pdf_export_running, show_export_dialog
+from ordbyggaren.prefetch import RoundPrefetcher
+from ordbyggaren.profile_cache import ProfileCache
+from ordbyggaren.profiles import ProfileManager
+from ordbyggaren.session import GameSession
+from ordbyggaren.tiles import SlotRow, TilePool
+from ordbyggaren.words import WORDS
+
+# Larger lexicons are not pre-rendered into the speech cache.
+PREWARM_LIMIT = 500
 
 
 class OrdbyggarenWindow(Adw.ApplicationWindow):
     def __init__(self, **kwargs):
         super().__init__(**kwargs, default_width=500, default_height=650,
                          title=_("Word Builder"))
-        self.difficulty = list(WORDS.keys())[0]
-        self.current_word = ""
-        self.current_emoji = ""
-        self.score = 0
-        self.attempts = 0
-        self.results = self._load_results()
+        self.profiles = self._open_profiles()
+        self.profile_cache = ProfileCache(self.profiles)
+        state = self.profile_cache.switch(self.profiles.current)
+        self.lexicon = lexicon.load_default(WORDS)
+        self.session = GameSession(self.lexicon, WORDS)
+        self.session.use_profile(state)
+        self.prefetch = RoundPrefetcher(self.session)
+        self.sounds = sound_bank.get_bank()
+        self.sounds.load_async()
+        self.alignments = alignment.get_index()
+        # Until the word graph is ready only the round's word is accepted.
+        dawg.get_dawg_async(self.lexicon, self._on_words_loaded)
+        self.connect("close-request", self._on_close_request)
         self._build_ui()
         self._setup_shortcuts()
         self._new_word()
         self._start_clock()
+        if len(self.lexicon) <= PREWARM_LIMIT:
+            phonetics.prewarm(self.lexicon.words(), "sv")
+            self.alignments.build_async(self.lexicon)
+        else:
+            # Larger lexicons are aligned ahead with python3 -m ordbyggaren.alignment.
+            self.alignments.load_async()
 
     def _build_ui(self):
         main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
@@ -64,7 +67,14 @@ class OrdbyggarenWindow(Adw.ApplicationWindow):
         export_btn.connect("clicked", self._on_export)
         header.pack_end(export_btn)
 
+        self.sound_btn = Gtk.ToggleButton(icon_name="audio-volume-high-symbolic",
+                                          tooltip_text=_("Sound tiles"))
+        self.sound_btn.connect("toggled", self._on_sound_mode)
+        header.pack_end(self.sound_btn)
+
         menu = Gio.Menu()
+        menu.append(_("Switch Profile…"), "win.profile")
+        menu.append(_("Statistics"), "win.stats")
         menu.append(_("Export Results"), "win.export")
         menu.append(_("Keyboard Shortcuts"), "app.shortcuts")
         menu.append(_("About Word Builder"), "app.about")
@@ -76,6 +86,15 @@ class OrdbyggarenWindow(Adw.ApplicationWindow):
         export_action.connect("activate", self._on_export)
         self.add_action(export_action)
 
+        profile_action = Gio.SimpleAction.new("profile", None)
+        profile_action.connect("activate", self._on_profiles)
+        self.add_action(profile_action)
+
+        stats_action = Gio.SimpleAction.new("stats", None)
+        stats_action.connect("activate", self._on_stats)
+        self.add_action(stats_action)
+        self._stats_view = None
+
         # Score
         self.score_label = Gtk.Label(label="⭐ 0")
         self.score_label.add_css_class("title-2")
@@ -125,6 +144,9 @@ class OrdbyggarenWindow(Adw.ApplicationWindow):
         self.letters_box.set_margin_top(16)
         main_box.append(self.letters_box)
 
+        self.slots = SlotRow(self.answer_box)
+        self.tiles = TilePool(self.letters_box, self._on_letter_clicked)
+
         # Speak button
         speak_btn = Gtk.Button(label="🔊 " + _("Listen"))
         speak_btn.add_css_class("pill")
@@ -167,100 +189,86 @@ class OrdbyggarenWindow(Adw.ApplicationWindow):
         self.status_label.set_margin_bottom(4)
         main_box.append(self.status_label)
 
-        self.typed_letters = []
-
     def _new_word(self):
-        words = WORDS.get(self.difficulty, [])
-        if not words:
+        prepared = self.prefetch.take()
+        if prepared is not None:
+            rnd = self.session.begin(prepared.round)
+        else:
+            rnd = self.session.new_word()
+        if rnd is None:
             return
-        word, emoji = random.choice(words)
-        self.current_word = word
-        self.current_emoji = emoji
-        self.typed_letters = []
         self.feedback_label.set_label("")
 
-        self.emoji_label.set_label(emoji)
-        self.hint_label.set_label("_ " * len(word))
+        self.emoji_label.set_label(rnd.emoji)
+        self.hint_label.set_label("_ " * self.session.answer_length)
         self._update_answer()
         self._populate_letters()
 
     def _populate_letters(self):
-        child = self.letters_box.get_first_child()
-        while child:
-            nc = child.get_next_sibling()
-            self.letters_box.remove(child)
-            child = nc
-
-        letters = list(self.current_word.upper())
-        # Add some random distractors
-        extras = random.sample("ABCDEFGHIJKLMNOPRSTUVÅÄÖ", min(3, 24))
-        letters.extend(extras[:3])
-        random.shuffle(letters)
-
-        for ch in letters:
-            btn = Gtk.Button(label=ch)
-            btn.add_css_class("title-3")
-            btn.set_size_request(50, 50)
-            btn.connect("clicked", self._on_letter_clicked, ch)
-            self.letters_box.insert(btn, -1)
+        self.tiles.set_letters(self.session.letters)
 
     def _on_letter_clicked(self, btn, letter):
-        if len(self.typed_letters) < len(self.current_word):
-            self.typed_letters.append(letter)
+        if self.sound_btn.get_active():
+            self.sounds.play(letter)
+        if self.session.add_letter(letter):
             btn.set_sensitive(False)
             self._update_answer()
             self._check_word()
 
     def _update_answer(self):
-        child = self.answer_box.get_first_child()
-        while child:
-            nc = child.get_next_sibling()
-            self.answer_box.remove(child)
-            child = nc
-
-        for i in range(len(self.current_word)):
-            lbl = Gtk.Label()
-            lbl.add_css_class("title-2")
-            lbl.set_size_request(40, 40)
-            if i < len(self.typed_letters):
-                lbl.set_label(self.typed_letters[i])
-            else:
-                lbl.set_label("_")
-            self.answer_box.append(lbl)
+        self.slots.show(self.session.answer_length, self.session.typed_letters)
 
     def _check_word(self):
-        if len(self.typed_letters) == len(self.current_word):
-            attempt = "".join(self.typed_letters).lower()
-            self.attempts += 1
-            correct = attempt == self.current_word
-            if correct:
-                self.score += 1
-                self.score_label.set_label(f"⭐ {self.score}")
-                self.feedback_label.set_label("🎉 " + _("Correct!") + " 🎉")
-                self._log_result(self.current_word, correct=True)
-                GLib.timeout_add(1500, self._new_word)
+        correct = self.session.check()
+        if correct is None:
+            return
+        if correct:
+            self.score_label.set_label(f"⭐ {self.session.score}")
+            if self.session.alternative:
+                self.feedback_label.set_label(
+                    "🎉 " + _("%s is a word too!") % self.session.alternative.upper() + " 🎉")
             else:
-                self.feedback_label.set_label("❌ " + _("Try again!"))
-                self._log_result(self.current_word, correct=False)
-                GLib.timeout_add(1000, self._on_clear)
+                self.feedback_label.set_label("🎉 " + _("Correct!") + " 🎉")
+            GLib.timeout_add(1500, self._new_word)
+        else:
+            self.feedback_label.set_label("❌ " + _("Try again!"))
+            GLib.timeout_add(1000, self._on_clear)
 
     def _on_clear(self, *_args):
-        self.typed_letters = []
+        self.session.clear()
         self.feedback_label.set_label("")
         self._update_answer()
-        self._populate_letters()
+        self.tiles.restore()
         return False
 
     def _on_speak(self, btn):
-        try:
-            subprocess.Popen(["espeak-ng", "-v", "sv", self.current_word],
-                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        except FileNotFoundError:
-            pass
+        if self.sound_btn.get_active() and self.sounds.loaded:
+            # Sound out the tiles placed so far, or the whole word.
+            rnd = self.session.round
+            letters = self.session.typed_letters or (rnd.chunks if rnd else ())
+            if self.sounds.play_word(letters):
+                return
+        # Synthesis and playback run on the scheduler's thread.
+        speech_queue.get_scheduler().submit(self.session.current_word, "sv")
+
+    def _on_words_loaded(self, graph):
+        # Runs on the graph's loader thread; hand over on the main loop.
+        GLib.idle_add(self._set_validator, graph)
+
+    def _set_validator(self, graph):
+        self.session.validator = graph
+        return False
+
+    def _on_sound_mode(self, btn):
+        # Sound tiles split words into sound chunks (SJ, NG, CK, ...).
+        self.session.chunker = self.alignments.graphemes if btn.get_active() else None
+        self.prefetch.invalidate()
+        self._new_word()
 
     def _on_diff_changed(self, btn, diff):
         if btn.get_active():
-            self.difficulty = diff
+            self.session.set_difficulty(diff)
+            self.prefetch.invalidate()
             self._new_word()
 
     def _setup_shortcuts(self):
@@ -273,40 +281,74 @@ class OrdbyggarenWindow(Adw.ApplicationWindow):
             if keyval == Gdk.KEY_e or keyval == Gdk.KEY_E:
                 self._on_export()
                 return True
+        if keyval == Gdk.KEY_Escape and cancel_pdf_exports():
+            return True
         return False
 
-    def _results_path(self):
+    def _on_close_request(self, *_args):
+        self.prefetch.close()
+        self.profile_cache.close()
+        return False
+
+    def _open_profiles(self):
+        profiles = ProfileManager("ordbyggaren")
+        # Results logged before profiles were stored go to the current one.
         p = Path(GLib.get_user_config_dir()) / "ordbyggaren"
-        p.mkdir(parents=True, exist_ok=True)
-        return p / "results.json"
-
-    def _load_results(self):
-        path = self._results_path()
-        if path.exists():
-            try:
-                return json.loads(path.read_text())
-            except Exception:
-                pass
-        return []
-
-    def _save_results(self):
-        self._results_path().write_text(
-            json.dumps(self.results, indent=2, ensure_ascii=False))
-
-    def _log_result(self, word, correct):
-        self.results.append({
-            "word": word,
-            "difficulty": self.difficulty,
-            "correct": correct,
-            "attempts": self.attempts,
-            "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
-        })
-        self.results = self.results[-500:]
-        self._save_results()
+        profiles.import_journal(journal.ResultsJournal(p / "results.jsonl",
+                                                       legacy_paths=[p / "results.json"]))
+        return profiles
 
     def _on_export(self, *args):
-        show_export_dialog(self, self.results, self.score,
-                          lambda msg: self.status_label.set_label(msg))
+        show_export_dialog(self, self.session.results, self.session.score,
+                          lambda msg: self.status_label.set_label(msg),
+                          profile=self.profiles.current)
+
+    def _on_profiles(self, *args):
+        dialog = Adw.AlertDialog.new(_("Switch Profile"), None)
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=4)
+        group = None
+        checks = []
+        for name in sorted(self.profiles.list_profiles()):
+            check = Gtk.CheckButton(label=name, active=name == self.profiles.current)
+            if group is None:
+                group = check
+            else:
+                check.set_group(group)
+            box.append(check)
+            checks.append((name, check))
+        entry = Gtk.Entry(placeholder_text=_("New profile"))
+        box.append(entry)
+        dialog.set_extra_child(box)
+        dialog.add_response("cancel", _("Cancel"))
+        dialog.add_response("switch", _("Switch"))
+        dialog.set_default_response("switch")
+        dialog.set_close_response("cancel")
+        dialog.connect("response", self._on_profile_response, checks, entry)
+        dialog.present(self)
+
+    def _on_profile_response(self, dialog, response, checks, entry):
+        if response != "switch":
+            return
+        name = entry.get_text().strip()
+        if not name:
+            name = next((n for n, check in checks if check.get_active()), None)
+        if name and name != self.profiles.current:
+            self._switch_profile(name)
+
+    def _switch_profile(self, name):
+        state = self.profile_cache.switch(name)
+        self.session.use_profile(state)
+        self.prefetch.invalidate()
+        self.score_label.set_label(f"⭐ {self.session.score}")
+        self.status_label.set_label(_("Profile: %s") % name)
+        self._new_word()
+
+    def _on_stats(self, *args):
+        from ordbyggaren.stats_view import StatsView
+        if self._stats_view is None:
+            self._stats_view = StatsView(self.session.stats)
+        self._stats_view.refresh(self.session.stats)
+        self._stats_view.present(self)
 
     def _toggle_theme(self, btn):
         mgr = Adw.StyleManager.get_default()
@@ -320,6 +362,9 @@ class OrdbyggarenWindow(Adw.ApplicationWindow):
         self._update_clock()
 
     def _update_clock(self):
+        if pdf_export_running():
+            # Leave the export progress visible.
+            return True
         now = GLib.DateTime.new_now_local()
         self.status_label.set_label(now.format("%Y-%m-%d %H:%M:%S"))
         return True
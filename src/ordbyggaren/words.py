@@ -0,0 +1,20 @@
+"""Built-in word list, used when no lexicon file is installed."""
+import gettext
+
+_ = gettext.gettext
+
+# Word lists by difficulty
+WORDS = {
+    _("Easy"): [
+        ("sol", "☀️"), ("bil", "🚗"), ("hus", "🏠"), ("bok", "📖"),
+        ("mat", "🍽️"), ("ko", "🐄"), ("is", "🍦"), ("uv", "🦉"),
+    ],
+    _("Medium"): [
+        ("katt", "🐱"), ("hund", "🐕"), ("fisk", "🐟"), ("skog", "🌲"),
+        ("boll", "⚽"), ("lamm", "🐑"), ("ring", "💍"), ("sand", "🏖️"),
+    ],
+    _("Hard"): [
+        ("skola", "🏫"), ("blomma", "🌸"), ("vatten", "💧"), ("stjärna", "⭐"),
+        ("groda", "🐸"), ("morot", "🥕"), ("cykel", "🚲"), ("papper", "📄"),
+    ],
+}
@@ -0,0 +1,42 @@
+import random
+from collections import Counter
+
+from ordbyggaren.distractors import DISTRACTOR_LETTERS, DistractorEngine
+from ordbyggaren.learning_stats import LearningStats
+
+ROUNDS = 20000
+
+
+def pick_rates(engine, word, seed=0):
+    rng = random.Random(seed)
+    counts = Counter()
+    for _i in range(ROUNDS):
+        counts.update(engine.pick(word, 3, rng))
+    return {c: n / ROUNDS for c, n in counts.items()}
+
+
+def test_sol_avoids_close_letters():
+    rates = pick_rates(DistractorEngine(), "sol")
+    # Uniform sampling of 3 from the 21 letters not in "sol" shows each 14.3 %.
+    uniform = 3 / (len(DISTRACTOR_LETTERS) - 3)
+    assert rates.get("Ö", 0.0) < uniform
+    assert max(rates.values()) < 0.3
+    # Similar letters are still preferred over unrelated ones.
+    assert rates["Å"] > rates["M"]
+    assert not set(rates) & set("SOL")
+
+
+def test_learner_confusions_raise_placed_letter():
+    stats = LearningStats()
+    for _i in range(5):
+        stats.add({"word": "sol", "correct": False, "answer": "sum"})
+    engine = DistractorEngine(stats=stats)
+    assert pick_rates(engine, "sol")["M"] > pick_rates(DistractorEngine(), "sol")["M"]
+
+
+def test_swapped_letters_are_not_confusions():
+    stats = LearningStats()
+    stats.add({"word": "sol", "correct": False, "answer": "slo"})
+    assert not stats.pairs
+    stats.add({"word": "sol", "correct": False, "answer": "söl"})
+    assert stats.confused_pairs() == [("O", "Ö", 1)]
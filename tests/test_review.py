@@ -0,0 +1,51 @@
+from ordbyggaren.review import INTERVALS, SNOOZE, ReviewScheduler
+
+T0 = 1_000_000.0
+
+
+def test_correct_word_not_due_before_interval():
+    review = ReviewScheduler()
+    review.record("sol", "Easy", True, T0)
+    interval = INTERVALS[1]
+    assert review.due_word("Easy", now=T0 + interval - 1) is None
+    assert review.due_word("Easy", now=T0 + interval) == "sol"
+
+
+def test_missed_word_comes_back_early_within_its_interval():
+    review = ReviewScheduler()
+    review.record("sol", "Easy", True, T0)
+    review.record("sol", "Easy", False, T0)
+    assert review.due_word("Easy", now=T0) is None
+    assert review.due_word("Easy", now=T0 + INTERVALS[0]) == "sol"
+    review.record("bil", "Easy", False, T0)
+    assert review.due_word("Easy", now=T0 + INTERVALS[0] / 2) == "bil"
+
+
+def test_snoozed_word_is_held_back():
+    review = ReviewScheduler()
+    review.record("sol", "Easy", False, T0)
+    now = T0 + INTERVALS[0]
+    assert review.due_word("Easy", now=now) == "sol"
+    assert review.due_word("Easy", now=now + SNOOZE - 1) is None
+    assert review.due_word("Easy", now=now + SNOOZE) == "sol"
+
+
+def test_released_word_is_due_again():
+    review = ReviewScheduler()
+    review.record("sol", "Easy", False, T0)
+    now = T0 + INTERVALS[0]
+    assert review.due_word("Easy", now=now) == "sol"
+    review.release("sol")
+    assert review.due_word("Easy", now=now + 1) == "sol"
+
+
+def test_other_word_does_not_advance_review():
+    results = [
+        {"word": "sol", "difficulty": "Easy", "correct": False,
+         "date": "2026-01-05 10:00", "answer": "slo"},
+        {"word": "sol", "difficulty": "Easy", "correct": True,
+         "date": "2026-01-05 10:01", "answer": "los"},
+    ]
+    review = ReviewScheduler.from_results(results)
+    assert review.state("sol").seen == 1
+    assert review.state("sol").streak == 0